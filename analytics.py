@@ -0,0 +1,336 @@
+import numpy as np
+
+from scores import score_value, vote_total
+
+OUTLIER_K = 2.5          # 偏离项目中位数超过 K 倍稳健标准差即视为异常
+OUTLIER_MIN_SCALE = 2.0  # 稳健标准差的下限（分），避免专家意见高度一致时把微小差异判为异常
+
+
+def _row_medians(values, n):
+    """按行求中位数，values 中缺失为 NaN，n 为每行有效值个数（np.sort 会把 NaN 排在末尾）。"""
+    ordered = np.sort(values, axis=1)
+    rows = np.arange(len(n))
+    lo = np.maximum((n - 1) // 2, 0)
+    hi = np.maximum(n // 2, 0)
+    return np.where(n > 0, (ordered[rows, lo] + ordered[rows, hi]) / 2, np.nan)
+
+
+class ScoreMatrix:
+    """(项目 × 专家 × 评分项) 的稠密分数矩阵，缺失分数为 NaN（np.isnan 即缺失掩码）。
+
+    最后一个通道存放每条评分的总分（见 vote_total），统计量均基于该通道。
+
+    项目与专家各自映射到固定下标，容量不足时按倍数扩容；
+    写入或清除评分只修改对应的切片，不重建整个矩阵。
+    """
+
+    def __init__(self, score_cols, projects=64, experts=64):
+        self.score_cols = list(score_cols)
+        self.data = np.full((projects, experts, len(self.score_cols) + 1), np.nan, dtype=np.float32)
+        self.project_index = {}  # 项目名称 -> 行下标
+        self.expert_index = {}   # 专家 -> 列下标
+        self.projects = []
+        self.experts = []
+
+    def _slot(self, index, names, key, axis):
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(names)
+            names.append(key)
+            if i >= self.data.shape[axis]:
+                shape = list(self.data.shape)
+                shape[axis] *= 2
+                grown = np.full(shape, np.nan, dtype=self.data.dtype)
+                grown[:self.data.shape[0], :self.data.shape[1]] = self.data
+                self.data = grown
+        return i
+
+    def set_vote(self, vote):
+        i = self._slot(self.project_index, self.projects, vote['Project Name'], 0)
+        j = self._slot(self.expert_index, self.experts, vote['Expert'], 1)
+        values = [score_value(vote, col) for col in self.score_cols]
+        for c, x in enumerate(values):
+            self.data[i, j, c] = np.nan if x is None else x
+        scored = any(x is not None for x in values) or score_value(vote, 'Total') is not None
+        self.data[i, j, -1] = vote_total(vote, self.score_cols) if scored else np.nan
+
+    def remove_vote(self, project, expert):
+        i = self.project_index.get(project)
+        j = self.expert_index.get(expert)
+        if i is not None and j is not None:
+            self.data[i, j] = np.nan
+
+    def clear_project(self, project):
+        i = self.project_index.get(project)
+        if i is not None:
+            self.data[i] = np.nan
+
+    def snapshot(self):
+        """返回 (项目列表, 专家列表, 分数矩阵副本)，供后台线程在锁外计算。"""
+        return list(self.projects), list(self.experts), self.data[:len(self.projects), :len(self.experts)].copy()
+
+    def totals(self):
+        """返回 (项目 × 专家) 的总分矩阵，该专家未评该项目时为 NaN。"""
+        return self.data[:len(self.projects), :len(self.experts), -1].astype(np.float64)
+
+    def statistics(self):
+        """向量化计算每个项目的稳健统计量，返回 {项目名称: 统计字典}。
+
+        - 去极值均分：评分人数 ≥ 3 时去掉一个最高分和一个最低分后取平均，否则为普通均值
+        - 中位数、样本标准差
+        - 标准化均分：先按专家把其全部总分做 z-score（消除个人打分松紧），再按项目取平均
+        - 异常专家：总分偏离项目中位数超过 OUTLIER_K 倍稳健标准差（1.4826 × MAD）
+        """
+        totals = self.totals()
+        if totals.size == 0:
+            return {}
+        scored = ~np.isnan(totals)
+        n = scored.sum(axis=1)
+        has = n > 0
+
+        filled = np.where(scored, totals, 0.0)
+        sums = filled.sum(axis=1)
+        maxs = np.where(has, np.where(scored, totals, -np.inf).max(axis=1), 0.0)
+        mins = np.where(has, np.where(scored, totals, np.inf).min(axis=1), 0.0)
+        mean = np.divide(sums, n, out=np.full(n.shape, np.nan), where=has)
+        trimmed = np.divide(sums - maxs - mins, n - 2, out=mean.copy(), where=n >= 3)
+        median = _row_medians(totals, n)
+        sq = np.where(scored, (totals - mean[:, None]) ** 2, 0.0).sum(axis=1)
+        std = np.sqrt(np.divide(sq, n - 1, out=np.full(n.shape, np.nan), where=n >= 2))
+
+        # 按专家做 z-score 标准化
+        m = scored.sum(axis=0)
+        expert_mean = np.divide(filled.sum(axis=0), m, out=np.zeros(m.shape), where=m > 0)
+        expert_sq = np.where(scored, (totals - expert_mean) ** 2, 0.0).sum(axis=0)
+        expert_sd = np.sqrt(np.divide(expert_sq, m - 1, out=np.zeros(m.shape), where=m >= 2))
+        z_ok = scored & (expert_sd > 0)
+        z = np.divide(totals - expert_mean, expert_sd, out=np.zeros(totals.shape), where=z_ok)
+        z_n = z_ok.sum(axis=1)
+        z_mean = np.divide(z.sum(axis=1, where=z_ok), z_n, out=np.full(n.shape, np.nan), where=z_n > 0)
+
+        # 基于中位数绝对偏差的异常专家判定
+        deviation = np.abs(totals - median[:, None])
+        mad = np.nan_to_num(_row_medians(deviation, n))
+        scale = np.maximum(1.4826 * mad, OUTLIER_MIN_SCALE)
+        outliers = scored & (n[:, None] >= 3) & (deviation > OUTLIER_K * scale[:, None])
+
+        stats = {}
+        for i in np.flatnonzero(has):
+            stats[self.projects[i]] = {
+                "Trimmed Mean": float(trimmed[i]),
+                "Median": float(median[i]),
+                "Std": float(std[i]),
+                "Z Mean": float(z_mean[i]),
+                "Outlier Experts": [self.experts[j] for j in np.flatnonzero(outliers[i])],
+            }
+        return stats
+
+
+# --- 评审一致性（评分者间信度） ---
+def _average_ranks(x):
+    """一维数组的秩（从 1 开始，并列取平均秩），同时返回各并列组的大小。"""
+    order = np.argsort(x, kind='mergesort')
+    ranks = np.empty(len(x))
+    ranks[order] = np.arange(1, len(x) + 1)
+    _, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    return (np.bincount(inverse, weights=ranks) / counts)[inverse], counts
+
+
+def _sorted_average_ranks(v):
+    """已按升序排列的一维数组的平均秩（从 1 开始，并列取平均秩）。"""
+    new_group = np.empty(len(v), dtype=bool)
+    new_group[:1] = True
+    np.not_equal(v[1:], v[:-1], out=new_group[1:])
+    starts = np.flatnonzero(new_group)
+    sizes = np.diff(starts, append=len(v))
+    return np.repeat(starts + (sizes + 1) / 2, sizes)
+
+
+def _pearson(a, b):
+    a = a - a.mean()
+    b = b - b.mean()
+    denom = np.sqrt(np.dot(a, a) * np.dot(b, b))
+    return float(np.dot(a, b) / denom) if denom > 0 else None
+
+
+def spearman(a, b):
+    """两组成对分数的 Spearman 秩相关（并列取平均秩），少于 3 对或任一组全部相同时返回 None。"""
+    if len(a) < 3:
+        return None
+    return _pearson(_average_ranks(a)[0], _average_ranks(b)[0])
+
+
+def icc(y):
+    """完整矩阵 y（项目 × 专家）的 ICC(2,1) 与 ICC(2,k)：双向随机、绝对一致（Shrout & Fleiss）。
+
+    ICC(2,1) 衡量单个专家评分的可靠程度，ICC(2,k) 衡量 k 位专家平均分的可靠程度；无法计算时为 None。
+    """
+    n, k = y.shape
+    if n < 2 or k < 2:
+        return None, None
+    grand = y.mean()
+    row_means = y.mean(axis=1)
+    col_means = y.mean(axis=0)
+    msr = k * ((row_means - grand) ** 2).sum() / (n - 1)
+    msc = n * ((col_means - grand) ** 2).sum() / (k - 1)
+    mse = ((y - row_means[:, None] - col_means[None, :] + grand) ** 2).sum() / ((n - 1) * (k - 1))
+    single_denom = msr + (k - 1) * mse + k * (msc - mse) / n
+    average_denom = msr + (msc - mse) / n
+    single = float((msr - mse) / single_denom) if single_denom > 0 else None
+    average = float((msr - mse) / average_denom) if average_denom > 0 else None
+    return single, average
+
+
+def kendall_w(y):
+    """完整矩阵 y（项目 × 专家）的 Kendall 协和系数 W（含并列校正），0 为毫无一致、1 为排序完全相同。"""
+    n, m = y.shape
+    if n < 2 or m < 2:
+        return None
+    ranks = np.empty(y.shape)
+    ties = 0.0
+    for j in range(m):
+        ranks[:, j], counts = _average_ranks(y[:, j])
+        ties += float((counts ** 3 - counts).sum())
+    r = ranks.sum(axis=1)
+    s = float(((r - r.mean()) ** 2).sum())
+    denom = m * m * (n ** 3 - n) - m * ties
+    return 12 * s / denom if denom > 0 else None
+
+
+def _complete_block(rated):
+    """选出用于 ICC 与 Kendall W 的完整子矩阵：(行下标, 列下标)。
+
+    从全部有评分的专家出发，依次剔除评分项目最少的专家，取（被所有保留专家评过的项目数 × 专家数）最大的一组。
+    各专家的评分项目数不随剔除变化，剔除顺序一次排好，每剔除一位只需更新各项目的缺评人数。
+    """
+    rows = np.flatnonzero(rated.any(axis=1))
+    cols = np.flatnonzero(rated.any(axis=0))
+    sub = rated[np.ix_(rows, cols)]
+    order = np.argsort(sub.sum(axis=0), kind='stable')  # 剔除顺序
+    missing = (~sub).sum(axis=1)  # 每个项目在保留专家中的缺评人数
+    best_size, best_dropped = 0, None
+    for dropped in range(len(cols) - 1):  # 至少保留 2 位专家
+        n_full = int((missing == 0).sum())
+        if n_full >= 2 and n_full * (len(cols) - dropped) > best_size:
+            best_size, best_dropped = n_full * (len(cols) - dropped), dropped
+        missing -= ~sub[:, order[dropped]]
+    if best_dropped is None:
+        return rows[:0], cols
+    keep = np.sort(order[best_dropped:])
+    return rows[sub[:, keep].all(axis=1)], cols[keep]
+
+
+def pairwise_spearman(values, rated):
+    """专家两两之间的 Spearman 秩相关矩阵（专家 × 专家），共同项目少于 3 个或无法计算处为 NaN。
+
+    两人评过的项目完全相同时（评审中的常见情形），每位专家的秩只需在其评过的项目上计算一次，
+    再用矩阵运算一次求出所有这类专家对的 Pearson 相关；共同项目比任一方评过的项目少时，
+    秩必须在共同项目上重新计算，这些专家对逐对调用 spearman。两种情况的结果都与 spearman 一致。
+    """
+    ranks = np.zeros(values.shape)
+    for j in range(values.shape[1]):
+        if rated[:, j].any():
+            ranks[rated[:, j], j] = _average_ranks(values[rated[:, j], j])[0]
+    mask = rated.astype(np.float64)
+    n = mask.T @ mask                   # 共同项目数
+    sums = ranks.T @ mask               # [a, b]：a 在与 b 共同项目上的秩之和
+    squares = (ranks * ranks).T @ mask
+    products = ranks.T @ ranks
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = products - sums * sums.T / n
+        var = squares - sums * sums / n
+        rho = cov / np.sqrt(var * var.T)
+    # 浮点误差可能使全部相同的秩方差略大于 0，按相对量判定
+    degenerate = (var <= 1e-9 * np.maximum(squares, 1)) | (var.T <= 1e-9 * np.maximum(squares.T, 1))
+    rho[(n < 3) | degenerate] = np.nan
+
+    counts = np.diag(n)
+    partial = np.triu((n >= 3) & ((n < counts[:, None]) | (n < counts[None, :])), 1)
+    if partial.any():
+        # 各专家按分数排好的项目顺序只算一次，逐对时只需在共同项目上截取并重新给出平均秩
+        orders, ordered = [], []
+        for j in range(values.shape[1]):
+            idx = np.flatnonzero(rated[:, j])
+            idx = idx[np.argsort(values[idx, j], kind='mergesort')]
+            orders.append(idx)
+            ordered.append(values[idx, j])
+        a_ranks, b_ranks = np.zeros(len(values)), np.zeros(len(values))
+        for a, b in zip(*np.nonzero(partial)):
+            common = rated[:, a] & rated[:, b]
+            for j, out in ((a, a_ranks), (b, b_ranks)):
+                keep = common[orders[j]]
+                out[orders[j][keep]] = _sorted_average_ranks(ordered[j][keep])
+            r = _pearson(a_ranks[common], b_ranks[common])
+            rho[a, b] = rho[b, a] = np.nan if r is None else r
+    np.fill_diagonal(rho, np.nan)
+    return rho
+
+
+def agreement(data, experts, score_cols, weakest_pairs=20):
+    """评审一致性分析：基于 ScoreMatrix 快照（项目 × 专家 × 评分项，最后一个通道为总分）。
+
+    - ICC(2,1) / ICC(2,k)：总分及各评分项，基于被同一组专家全部评过的项目
+    - Kendall W：同一完整子矩阵上各专家对项目排序的协和程度
+    - Spearman：专家两两之间（至少 3 个共同项目）的总分秩相关（见 pairwise_spearman），
+      结果只保留全体平均、每位专家与他人的平均，以及一致性最差的 weakest_pairs 对
+    - 专家偏差：该专家总分与其他专家对同一项目平均分之差的平均值（正为偏松、负为偏严），
+      以及平均绝对偏差和与该共识排序的 Spearman 相关
+    """
+    totals = data[:, :, -1].astype(np.float64)
+    rated = ~np.isnan(totals)
+    rows, cols = _complete_block(rated)
+    block = np.ix_(rows, cols)
+    icc_single, icc_average = icc(totals[block])
+
+    criteria = []
+    for c, col in enumerate(score_cols):
+        values = data[:, :, c].astype(np.float64)[block]
+        # 该评分项只属于部分评审阶段时，只用有该项分数的项目
+        values = values[~np.isnan(values).any(axis=1)]
+        single, average = icc(values)
+        criteria.append({"criterion": col, "projects": len(values), "icc_single": single, "icc_average": average})
+
+    active = np.flatnonzero(rated.any(axis=0))
+    rho = pairwise_spearman(totals[:, active], rated[:, active])
+    valid = ~np.isnan(rho)
+    upper = np.triu(valid, 1)
+    order = np.argsort(rho[upper], kind='stable')[:weakest_pairs]
+    a_idx, b_idx = np.nonzero(upper)
+    common = rated[:, active].astype(np.int64)
+    weakest = [
+        (experts[active[a_idx[k]]], experts[active[b_idx[k]]],
+         int((common[:, a_idx[k]] & common[:, b_idx[k]]).sum()), float(rho[a_idx[k], b_idx[k]]))
+        for k in order
+    ]
+    peer_n = valid.sum(axis=1)
+    peer_mean = np.divide(np.where(valid, rho, 0.0).sum(axis=1), peer_n,
+                          out=np.full(len(active), np.nan), where=peer_n > 0)
+
+    n = rated.sum(axis=1)
+    sums = np.where(rated, totals, 0.0).sum(axis=1)
+    bias_rows = []
+    for pos, j in enumerate(active):
+        own = rated[:, j] & (n > 1)
+        consensus = (sums[own] - totals[own, j]) / (n[own] - 1)
+        deviation = totals[own, j] - consensus
+        bias_rows.append({
+            "expert": experts[j],
+            "projects": int(rated[:, j].sum()),
+            "bias": float(deviation.mean()) if own.any() else None,
+            "abs_deviation": float(np.abs(deviation).mean()) if own.any() else None,
+            "spearman": spearman(totals[own, j], consensus),
+            "peer_spearman": float(peer_mean[pos]) if peer_n[pos] else None,
+        })
+
+    return {
+        "projects": len(rows),
+        "experts": [experts[j] for j in cols],
+        "icc_single": icc_single,
+        "icc_average": icc_average,
+        "kendall_w": kendall_w(totals[block]),
+        "mean_spearman": float(rho[upper].mean()) if upper.any() else None,
+        "pairs": int(upper.sum()),
+        "weakest_pairs": weakest,
+        "criteria": criteria,
+        "bias": bias_rows,
+    }
@@ -1,84 +1,192 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+import math
 import os
+import uuid
+
+from changelog import ChangeLog
+from drafts import DraftWriter
+from exports import EXPORT_FORMATS, export, format_available
+from history import RevisionHistory, SnapshotStorage
+from imports import read_project_file, validate_project_import
+from perf import SessionStateMeter, monitor
+from records import compact_vote, compact_votes
+from reliability import ReliabilityJobs
+from rubrics import load_rubrics
+from rounds import ReadOnlyStorage, RoundManager
+from scores import score_value, vote_total
+from storage import CsvStorage, SqliteStorage, VoteJournal, migrate_csv_to_sqlite
+from store import SubmitConflict, VoteStore
 
 # --- 配置部分 ---
 ADMIN_PASSWORD = "admin"  # 管理员密码
 EXPERT_PASSWORD = "123"   # 专家密码
+ROUNDS_DIR = "rounds"     # 评审轮次清单及新轮次的分区目录；以下数据文件名均相对于所在轮次的分区目录
 PROJECTS_FILE = "projects.csv"
 FINAL_VOTES_FILE = "final_votes.csv" 
-
-# --- 数据持久化函数 ---
-def load_data(file_path, default_cols):
-    """尝试加载CSV文件，如果文件不存在或为空，则返回空的DataFrame。"""
-    if os.path.exists(file_path):
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-            for col in default_cols:
-                if col not in df.columns:
-                    df[col] = pd.NA
-            return df.to_dict('records')
-        except pd.errors.EmptyDataError:
-            return []
-        except Exception as e:
-            st.error(f"加载数据文件 {file_path} 失败: {e}")
-            return []
-    return []
-
-def save_data(df, file_path):
-    """将DataFrame保存为CSV文件。"""
-    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
-    df.to_csv(file_path, index=False, encoding='utf-8')
-
-# --- 评分标准定义 (已修正波浪号为转义字符 '\~') ---
-CRITERIA = {
-    "中期": {
-        "research": {"name": "研究目标 (20分)", "desc": "项目申请书规定的阶段性研究内容是否按计划推进", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "tech": {"name": "技术指标 (30分)", "desc": "主要技术指标是否达到项目中期节点要求", "max": 30, "tips": "符合要求24\~30分；基本符合18\~23分；不符合＜18分。"},
-        "deliverables": {"name": "交付物 (20分)", "desc": "交付物形成情况能否支撑后续研究顺利完成", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "output": {"name": "成果产出 (20分)", "desc": "取得阶段性技术突破，提出初步的新理论、新方法；形成实验平台/仿真模型等", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "budget": {"name": "经费 (10分)", "desc": "经费使用合理合规，执行率与进度匹配", "max": 10, "tips": "符合要求8\~10分；基本符合5\~7分；不符合＜5分。"}
-    },
-    "结题": {
-        "research": {"name": "研究目标 (20分)", "desc": "项目申请书规定的研究内容是否全部实现", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "tech": {"name": "技术指标 (30分)", "desc": "主要技术指标是否全部完成", "max": 30, "tips": "符合要求24\~30分；基本符合18\~23分；不符合＜18分。"},
-        "deliverables": {"name": "交付物 (20分)", "desc": "交付物是否全部完成，且质量较高", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "output": {"name": "成果产出 (20分)", "desc": "取得技术突破，攻克关键核心技术；形成成果并取得知识产权/论文等", "max": 20, "tips": "符合要求16\~20分；基本符合12\~15分；不符合＜12分。"},
-        "budget": {"name": "经费 (10分)", "desc": "经费使用合理合规，经费执行率高", "max": 10, "tips": "符合要求8\~10分；基本符合5\~7分；不符合＜5分。"}
-    }
-}
+FINAL_VOTES_JOURNAL = "final_votes.journal"  # 最终评分的追加日志，定期压缩回 FINAL_VOTES_FILE
+JOURNAL_COMPACT_EVERY = 500                  # 日志累计多少条事件后压缩一次
+# 存储后端："csv"（默认）或 "sqlite"。首次切换到 sqlite 时会自动从现有 CSV 迁移数据。
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv")
+SQLITE_FILE = "review.db"
+CHANGE_LOG_FILE = "changes.log"  # 多进程部署时各进程共享的变更日志，用于互相同步内存数据
+HISTORY_DIR = "history"          # 修订历史（增量日志与快照）目录
+HISTORY_SNAPSHOT_EVERY = 200     # 每多少条修订写一次完整快照，决定回溯时最多重放的增量数
+DRAFTS_DIR = "drafts"          # 专家暂存评分的落盘目录，每位专家一个 JSON 文件
+DRAFT_FLUSH_INTERVAL = 2.0     # 暂存后台写入间隔（秒），也是异常退出时最多丢失的暂存时长
+DETAIL_PAGE_SIZE = 10          # 打分明细每页显示的项目数
+LIVE_REFRESH_INTERVAL = 5      # 实时看板自动刷新间隔（秒）
+RELIABILITY_POLL_INTERVAL = 2  # 一致性分析计算中时，面板检查结果的间隔（秒）
+RELIABILITY_DEBOUNCE = 10.0    # 两次一致性分析之间的最短间隔（秒），评审高峰期的连续提交合并为一次重算
+METRICS_PROM_FILE = "metrics.prom"   # 性能指标（Prometheus 文本格式），供本机采集代理抓取；实际文件名带进程号，如 metrics-1234.prom
+METRICS_JSON_FILE = "metrics.json"   # 同一份指标的 JSON 版本（同样按进程分文件）
+METRICS_EXPORT_INTERVAL = 30.0       # 指标文件写出间隔（秒）
+RUBRICS_FILE = "rubrics.json"        # 评分标准配置：各评审阶段的评分项、满分、权重与分档
+# 测量模式：设为 1 时每个会话每次重跑上报 session state 字节数，在“性能监控”中按在线用户列出
+SESSION_STATE_METRICS = os.environ.get("SESSION_STATE_METRICS") == "1"
+
+# --- 评分标准 ---
+# 从 RUBRICS_FILE 读取并编译为不可变的校验对象（按文件修改时间缓存，每次重跑只需一次 os.stat）。
+# 修改配置文件即可增减评审阶段、评分项、满分、权重与分档，评分记录的分数列随之变化。
+try:
+    RUBRICS = load_rubrics(RUBRICS_FILE)
+except (OSError, ValueError) as e:
+    st.error(f"加载评分标准 {RUBRICS_FILE} 失败: {e}")
+    st.stop()
 
 # --- 初始化 Session State ---
 project_default_cols = ['name', 'applicant', 'stage', 'time']
-vote_default_cols = ['Project Name', 'Stage', 'Expert', 'Research', 'Tech', 'Deliverables', 'Output', 'Budget', 'Total', 'Time']
-
-if 'projects' not in st.session_state:
-    st.session_state['projects'] = load_data(PROJECTS_FILE, project_default_cols)
-if 'final_votes' not in st.session_state:
-    st.session_state['final_votes'] = load_data(FINAL_VOTES_FILE, vote_default_cols) 
-
-if 'logged_in_user' not in st.session_state:
-    st.session_state['logged_in_user'] = None 
-if 'user_name' not in st.session_state:
-    st.session_state['user_name'] = ""
-
-if 'draft_votes' not in st.session_state:
-    st.session_state['draft_votes'] = {} 
-if 'final_submitted' not in st.session_state:
-    st.session_state['final_submitted'] = {} 
-
-# 初始化或更新实时分数缓存
-if 'live_scores' not in st.session_state:
-    st.session_state['live_scores'] = {}
-if 'last_selected_project' not in st.session_state:
-    st.session_state['last_selected_project'] = None
-if 'current_errors' not in st.session_state:
-    st.session_state['current_errors'] = []
-
-# 用于显示操作成功的临时状态
-if 'show_success' not in st.session_state:
-    st.session_state['show_success'] = None
+score_cols = list(RUBRICS.score_cols)  # 分数列随评分标准配置变化
+vote_default_cols = ['Project Name', 'Stage', 'Expert'] + score_cols + ['Total', 'Time']
+total_max = math.ceil(max(RUBRICS[stage].max_total for stage in RUBRICS.stages))  # 各阶段加权满分中的最大值
+
+def weighted_total(vote):
+    """评分记录的总分：优先取记录中的 Total，缺失时按该阶段评分标准的权重补算。"""
+    if score_value(vote, 'Total') is None and vote.get('Stage') in RUBRICS:
+        rubric = RUBRICS[vote['Stage']]
+        return rubric.total({key: score_value(vote, key) or 0 for key in rubric.keys})
+    return vote_total(vote, score_cols)
+
+def open_storage(partition_dir, columns, read_only=False):
+    """按 STORAGE_BACKEND 创建某个轮次分区的存储后端，columns 为评分记录的分数列。"""
+    def path(name):
+        return os.path.join(partition_dir, name)
+    vote_cols = ['Project Name', 'Stage', 'Expert'] + list(columns) + ['Total', 'Time']
+    journal = VoteJournal(path(FINAL_VOTES_FILE), path(FINAL_VOTES_JOURNAL), vote_cols, JOURNAL_COMPACT_EVERY)
+    csv_storage = CsvStorage(path(PROJECTS_FILE), project_default_cols, journal, read_only=read_only)
+    if STORAGE_BACKEND == "sqlite" and not (read_only and not os.path.exists(path(SQLITE_FILE))):
+        sqlite_storage = SqliteStorage(path(SQLITE_FILE), project_default_cols, vote_cols, read_only=read_only)
+        if not read_only:
+            migrate_csv_to_sqlite(csv_storage, sqlite_storage)
+        return sqlite_storage
+    return csv_storage
+
+@st.cache_resource
+def get_round_manager():
+    """进程内唯一的评审轮次清单。"""
+    return RoundManager(ROUNDS_DIR)
+
+@st.cache_resource(max_entries=1, on_release=VoteStore.close)
+def get_store(round_id, partition_dir, columns):
+    """进程内唯一的共享存储，所有会话读写同一份项目与评分数据（仅加载进行中的轮次）。
+
+    columns 为当前配置的分数列，评分标准的评分项变化后按新的列重新加载；
+    缓存只保留一份，被替换的旧实例随即关闭（释放变更日志与数据库连接）。
+
+    多个服务进程之间通过变更日志保持一致，每次重跑前 store.sync() 应用其他进程的写入。
+    """
+    changelog = ChangeLog(os.path.join(partition_dir, CHANGE_LOG_FILE))
+    history = RevisionHistory(os.path.join(partition_dir, HISTORY_DIR), HISTORY_SNAPSHOT_EVERY)
+    return VoteStore(open_storage(partition_dir, columns), columns, changelog, history)
+
+@st.cache_resource(max_entries=2, on_release=VoteStore.close)
+def get_archived_store(round_id, partition_dir, columns):
+    """按需打开已归档轮次（只读），最多同时缓存两个。"""
+    return VoteStore(ReadOnlyStorage(open_storage(partition_dir, columns, read_only=True)), columns)
+
+@st.cache_resource
+def get_draft_writer(partition_dir):
+    """进程内唯一的暂存后台写入器（按轮次分区存放）。"""
+    return DraftWriter(os.path.join(partition_dir, DRAFTS_DIR), DRAFT_FLUSH_INTERVAL)
+
+@st.cache_resource(max_entries=1, on_release=ReliabilityJobs.close)
+def get_reliability_jobs(round_id, columns):
+    """进程内唯一的评审一致性后台分析（按轮次与分数列），结果按数据版本缓存；被替换时停止旧的后台线程。"""
+    return ReliabilityJobs(columns, RELIABILITY_DEBOUNCE)
+
+@st.cache_resource(max_entries=8)
+def get_live_frames(store_id, version, _store):
+    """实时看板某一数据版本的 (排名表, 最近到达的评分表)，所有管理员会话共用；数据没变时自动刷新不再重建表格。"""
+    import pandas as pd
+    _, ranking = _store.live_board()
+    board = pd.DataFrame(ranking, columns=['Project Name', 'Stage', 'Submitted', 'Trimmed Mean', 'Total', 'Median'])
+    recent = pd.DataFrame(
+        [(datetime.fromtimestamp(at).strftime("%H:%M:%S"), v['Expert'], v['Project Name'], v.get('Total'))
+         for at, v in _store.recent_votes(10)],
+        columns=['到达时间', '专家', '项目', '总分'],
+    )
+    return board, recent
+
+@st.cache_resource
+def get_session_meter():
+    """进程内唯一的 session state 测量登记表（仅测量模式使用）。"""
+    return SessionStateMeter()
+
+@st.cache_resource
+def start_metrics_export():
+    """启动进程内唯一的指标文件导出线程。"""
+    monitor.start_export(METRICS_PROM_FILE, METRICS_JSON_FILE, METRICS_EXPORT_INTERVAL)
+    return monitor
+
+with monitor.phase("session_init"):
+    round_manager = get_round_manager()
+    active_round = round_manager.active()
+    store = get_store(active_round['id'], active_round['dir'], tuple(score_cols))
+    store.sync()
+    draft_writer = get_draft_writer(active_round['dir'])
+    start_metrics_export()
+
+    if 'logged_in_user' not in st.session_state:
+        st.session_state['logged_in_user'] = None 
+    if 'user_name' not in st.session_state:
+        st.session_state['user_name'] = ""
+
+    if 'draft_votes' not in st.session_state:
+        st.session_state['draft_votes'] = {} 
+
+    # 初始化或更新实时分数缓存
+    if 'live_scores' not in st.session_state:
+        st.session_state['live_scores'] = {}
+    if 'last_selected_project' not in st.session_state:
+        st.session_state['last_selected_project'] = None
+    if 'current_errors' not in st.session_state:
+        st.session_state['current_errors'] = []
+
+    # 用于显示操作成功的临时状态
+    if 'show_success' not in st.session_state:
+        st.session_state['show_success'] = None
+    # 批量导入上传控件的 key 序号，导入成功后递增以清空已上传的文件
+    if 'import_uploader_key' not in st.session_state:
+        st.session_state['import_uploader_key'] = 0
+
+    # 轮次切换后丢弃本会话中属于上一轮次的暂存与输入状态
+    if st.session_state.get('round_id') != active_round['id']:
+        st.session_state['round_id'] = active_round['id']
+        st.session_state['draft_votes'] = {}
+        st.session_state['live_scores'] = {}
+        st.session_state['last_selected_project'] = None
+        st.session_state['current_errors'] = []
+        if st.session_state['logged_in_user'] == "expert":
+            expert_name = st.session_state['user_name']
+            st.session_state['draft_votes'][expert_name] = compact_votes(draft_writer.load(expert_name), vote_default_cols)
+
+    # 会话中只保存本用户自己的增量（暂存评分、输入与界面选择），共享的项目、评分与汇总一律从 store 读取；
+    # 暂存评分以紧凑记录（VoteRow）保存，名称驻留，不在每条记录里重复列名。
+    if SESSION_STATE_METRICS:
+        session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+        get_session_meter().record(
+            session_id, st.session_state['user_name'], st.session_state['logged_in_user'], st.session_state.to_dict()
+        )
 
 
 # --- 界面逻辑 ---
@@ -108,33 +216,31 @@ with st.sidebar:
     pwd = st.text_input("请输入密码", type="password")
     
     if st.button("登录"):
-        if role == "管理员" and pwd == ADMIN_PASSWORD:
-            st.session_state['logged_in_user'] = "admin"
-            st.session_state['user_name'] = "管理员"
-            st.success("管理员登录成功")
-            st.rerun()
-        elif role == "专家" and pwd == EXPERT_PASSWORD:
-            if login_name_input.strip():
-                st.session_state['logged_in_user'] = "expert"
-                st.session_state['user_name'] = login_name_input 
-                
-                if login_name_input not in st.session_state['draft_votes']:
-                    st.session_state['draft_votes'][login_name_input] = {}
+        with monitor.phase("login_check"):
+            if role == "管理员" and pwd == ADMIN_PASSWORD:
+                st.session_state['logged_in_user'] = "admin"
+                st.session_state['user_name'] = "管理员"
+                st.success("管理员登录成功")
+                st.rerun()
+            elif role == "专家" and pwd == EXPERT_PASSWORD:
+                if login_name_input.strip():
+                    st.session_state['logged_in_user'] = "expert"
+                    st.session_state['user_name'] = login_name_input 
                 
-                # 如果当前专家没有最终提交记录，或者管理员清空了所有专家的记录，则需要重新检查
-                if login_name_input not in st.session_state['final_submitted'] or not st.session_state['final_submitted'].get(login_name_input, False):
-                    # 检查该专家是否已对所有项目完成最终提交
-                    submitted = all(any(v['Project Name'] == p['name'] and v['Expert'] == login_name_input for v in st.session_state['final_votes']) 
-                                    for p in st.session_state['projects'])
-                    st.session_state['final_submitted'][login_name_input] = submitted
-
+                    if login_name_input not in st.session_state['draft_votes']:
+                        # 恢复该专家此前落盘的暂存评分（服务重启或连接断开后不丢失）
+                        st.session_state['draft_votes'][login_name_input] = compact_votes(
+                            draft_writer.load(login_name_input), vote_default_cols
+                        )
+                    # 强制评分面板按恢复的暂存重新初始化 live_scores
+                    st.session_state['last_selected_project'] = None
                     
-                st.success(f"欢迎您，{login_name_input} 专家")
-                st.rerun()
+                    st.success(f"欢迎您，{login_name_input} 专家")
+                    st.rerun()
+                else:
+                    st.error("专家登录必须要输入姓名！")
             else:
-                st.error("专家登录必须要输入姓名！")
-        else:
-            st.error("密码错误")
+                st.error("密码错误")
 
     if st.button("退出登录"):
         st.session_state['logged_in_user'] = None
@@ -149,6 +255,10 @@ current_user_name = st.session_state['user_name']
 #                         管理员控制台 
 # =================================================================
 if user_type == "admin":
+    # pandas / numpy 只有管理员的汇总、导出与进度矩阵用到，按需导入，专家与登录页的冷启动不必付出这部分开销
+    import numpy as np
+    import pandas as pd
+    
     st.header("🔧 管理员控制台")
     
     # 2.1 添加项目 (已优化)
@@ -156,12 +266,12 @@ if user_type == "admin":
         c1, c2, c3, c4 = st.columns(4)
         new_name = c1.text_input("项目名称", key="new_project_name")
         new_applicant = c2.text_input("申请人", key="new_project_applicant")
-        new_stage = c3.selectbox("评审阶段", ["中期", "结题"], key="new_project_stage")
+        new_stage = c3.selectbox("评审阶段", list(RUBRICS.stages), key="new_project_stage")
         new_time = c4.number_input("时长", value=30, key="new_project_time")
         
         if st.button("添加项目"):
             if new_name:
-                if any(p['name'] == new_name for p in st.session_state['projects']):
+                if store.has_project(new_name):
                     st.error("该项目名称已存在！")
                 else:
                     new_project = {
@@ -170,23 +280,47 @@ if user_type == "admin":
                         "stage": new_stage,
                         "time": new_time
                     }
-                    st.session_state['projects'].append(new_project)
-                    save_data(pd.DataFrame(st.session_state['projects']), PROJECTS_FILE)
-                    
-                    # 项目列表变动，重置所有专家的最终提交锁定状态
-                    st.session_state['final_submitted'] = {} 
+                    # 项目列表变动后，完成度索引会自动解除相关专家的最终提交锁定
+                    store.add_project(new_project)
                     
                     st.session_state['show_success'] = f"项目 **{new_name}** 添加成功！"
                     st.rerun()
             else:
                 st.warning("请输入项目名称")
     
+    # 2.1.1 批量导入项目：整表一次校验、一次写入、一次刷新
+    with st.expander("📥 批量导入项目 (CSV / XLSX)", expanded=False):
+        st.caption(f"文件需包含列：{', '.join(project_default_cols)}；stage 取值为 {'/'.join(RUBRICS.stages)}，time 为数字（分钟）。")
+        uploaded_file = st.file_uploader(
+            "上传项目清单", type=["csv", "xlsx"], key=f"project_import_{st.session_state['import_uploader_key']}"
+        )
+        if uploaded_file is not None:
+            try:
+                import_df = read_project_file(uploaded_file)
+                valid_projects, import_errors = validate_project_import(
+                    import_df, [p['name'] for p in store.projects()], RUBRICS.stages, project_default_cols
+                )
+            except ImportError:
+                st.error("读取 XLSX 文件需要安装 openpyxl，请改用 CSV 或联系运维安装。")
+            except Exception as e:
+                st.error(f"解析文件失败：{e}")
+            else:
+                st.info(f"共 {len(import_df)} 行：有效 {len(valid_projects)} 行，错误 {len(import_errors)} 行。")
+                if not import_errors.empty:
+                    st.dataframe(import_errors, hide_index=True, use_container_width=True)
+                if valid_projects and st.button(f"导入 {len(valid_projects)} 个有效项目", type="primary"):
+                    store.add_projects(valid_projects)
+                    st.session_state['import_uploader_key'] += 1
+                    st.session_state['show_success'] = f"已批量导入 {len(valid_projects)} 个项目！"
+                    st.rerun()
+    
     # 2.2 项目删减功能 (使用 final_votes.csv)
     st.divider()
     st.subheader("🗑️ 项目与评分管理")
     
-    if st.session_state['projects']:
-        project_names = [p['name'] for p in st.session_state['projects']]
+    projects = store.projects()
+    if projects:
+        project_names = [p['name'] for p in projects]
         
         col1, col2 = st.columns([1, 2])
         
@@ -199,35 +333,15 @@ if user_type == "admin":
             
             # --- 功能 1: 清空评分 (已优化) ---
             if c_del1.button(f"清空 {project_to_manage} 评分", help="只删除该项目的所有专家最终提交的打分，项目本身保留"):
-                initial_votes_count = len(st.session_state['final_votes'])
-                st.session_state['final_votes'] = [
-                    v for v in st.session_state['final_votes'] if v['Project Name'] != project_to_manage
-                ]
-                
-                votes_deleted = initial_votes_count - len(st.session_state['final_votes'])
-                
-                save_data(pd.DataFrame(st.session_state['final_votes']), FINAL_VOTES_FILE)
-                
-                # 清空分数后，所有专家需要重新提交，重置锁定状态，使评分页可见
-                st.session_state['final_submitted'] = {} 
+                # 清空分数后，完成度索引随之更新，相关专家的评分页自动解锁
+                votes_deleted = store.clear_project_votes(project_to_manage)
 
                 st.session_state['show_success'] = f"项目 **{project_to_manage}** 的 {votes_deleted} 条最终评分已清空！"
                 st.rerun()
             
             # --- 功能 2: 删除整个项目 (已优化) ---
             if c_del2.button(f"❌ 删除 {project_to_manage} 项目", type="primary", help="删除项目本身，以及该项目所有的专家最终提交的打分"):
-                st.session_state['projects'] = [
-                    p for p in st.session_state['projects'] if p['name'] != project_to_manage
-                ]
-                st.session_state['final_votes'] = [
-                    v for v in st.session_state['final_votes'] if v['Project Name'] != project_to_manage
-                ]
-                
-                save_data(pd.DataFrame(st.session_state['projects']), PROJECTS_FILE)
-                save_data(pd.DataFrame(st.session_state['final_votes']), FINAL_VOTES_FILE)
-                
-                # 删除项目后，所有专家需要重新提交，重置锁定状态
-                st.session_state['final_submitted'] = {} 
+                store.delete_project(project_to_manage)
                 
                 st.session_state['show_success'] = f"项目 **{project_to_manage}** 已被彻底删除！"
                 st.rerun()
@@ -238,38 +352,321 @@ if user_type == "admin":
     st.divider()
     st.subheader("📊 评审数据汇总")
     
-    if st.session_state['final_votes']:
-        all_votes_df = pd.DataFrame(st.session_state['final_votes'])
-        all_votes_df['Total'] = all_votes_df[['Research', 'Tech', 'Deliverables', 'Output', 'Budget']].sum(axis=1)
-
+    # 实时看板：按变更流只重算有新变化的项目，数据没变时自动刷新只是一次版本号比较
+    live_on = st.toggle(f"🔴 实时看板（每 {LIVE_REFRESH_INTERVAL} 秒自动刷新）", value=True, key="live_refresh")
+    
+    @st.fragment(run_every=LIVE_REFRESH_INTERVAL if live_on else None)
+    def live_dashboard():
+        with monitor.phase("live_dashboard"):
+            store.sync()
+            # 看板行由共享存储按变更流增量维护，表格与计数按数据版本缓存，所有管理员会话共用
+            version, _ = store.live_board()
+            board_df, recent_df = get_live_frames(id(store), version, store)
+        
+        metric_cols = st.columns(3)
+        metric_cols[0].metric("项目数", len(board_df))
+        metric_cols[1].metric("最终评分条数", store.vote_count())
+        metric_cols[2].metric("已全部提交的专家", store.complete_expert_count())
+        if not board_df.empty:
+            st.dataframe(board_df, hide_index=True, use_container_width=True)
+            st.caption("Submitted 为已提交最终评分的专家数；排名按去极值均分。")
+        if not recent_df.empty:
+            st.markdown("**🆕 最近到达的评分**")
+            st.dataframe(recent_df, hide_index=True, use_container_width=True)
+    
+    live_dashboard()
+    
+    # 汇总直接取自共享存储中按项目增量维护的滚动统计，无需每次重建全量 DataFrame
+    with monitor.phase("admin_aggregation"):
+        summary_rows = store.summary()
+    if summary_rows:
         st.markdown("### 1️⃣ 各项目打分明细")
-        unique_projects = all_votes_df['Project Name'].unique()
+        display_cols = ['Project Name', 'Stage', 'Expert'] + score_cols + ['Total', 'Time']
+        
+        # 筛选与排序在共享存储的索引上完成，只展开当前页项目的评分明细
+        filter_ui = st.columns([2, 1, 1])
+        detail_search = filter_ui[0].text_input("🔍 搜索项目名称", key="detail_search")
+        detail_expert = filter_ui[1].selectbox("专家", ["全部"] + list(store.experts()), key="detail_expert")
+        detail_stage = filter_ui[2].selectbox("阶段", ["全部"] + list(RUBRICS.stages), key="detail_stage")
+        sort_ui = st.columns([2, 1, 1])
+        # 总分上限取各评审阶段加权满分的最大值，随评分标准配置变化
+        total_range = sort_ui[0].slider("总分范围", 0, total_max, (0, total_max), key="detail_total_range")
+        sort_options = {"项目名称": "name", "平均总分": "mean", "评分人数": "experts"}
+        detail_sort = sort_ui[1].selectbox("排序", list(sort_options), key="detail_sort")
+        detail_desc = sort_ui[2].toggle("降序", key="detail_desc")
+        
+        matched = store.find_projects(
+            search=detail_search,
+            expert=None if detail_expert == "全部" else detail_expert,
+            stage=None if detail_stage == "全部" else detail_stage,
+            total_range=None if total_range == (0, total_max) else total_range,
+            sort_by=sort_options[detail_sort],
+            descending=detail_desc,
+        )
         
-        for proj_name in unique_projects:
-            with st.expander(f"📁 项目：{proj_name} (点击展开详情)", expanded=False): 
-                proj_df = all_votes_df[all_votes_df['Project Name'] == proj_name].copy()
-                display_cols = ['Expert', 'Research', 'Tech', 'Deliverables', 'Output', 'Budget', 'Total', 'Time']
-                st.dataframe(proj_df[display_cols], use_container_width=True) 
+        if matched:
+            page_count = (len(matched) + DETAIL_PAGE_SIZE - 1) // DETAIL_PAGE_SIZE
+            page = st.number_input("页码", min_value=1, max_value=page_count, value=1, step=1, key="detail_page") if page_count > 1 else 1
+            page_names = matched[(page - 1) * DETAIL_PAGE_SIZE: page * DETAIL_PAGE_SIZE]
+            
+            page_rows = [v for name in page_names for v in store.votes_for_project(name)]
+            page_df = pd.DataFrame(page_rows, columns=vote_default_cols)
+            page_df['Total'] = [weighted_total(v) for v in page_rows]
+            if detail_expert != "全部":
+                page_df = page_df[page_df['Expert'] == detail_expert]
+            if total_range != (0, total_max):
+                page_df = page_df[page_df['Total'].between(*total_range)]
+            st.dataframe(page_df[display_cols], hide_index=True, use_container_width=True)
+            st.caption(f"共 {len(matched)} 个项目符合条件，第 {page}/{page_count} 页（每页 {DETAIL_PAGE_SIZE} 个项目）。")
+        else:
+            st.info("没有符合条件的项目。")
 
         st.markdown("### 2️⃣ 最终平均分汇总表")
-        summary_df = all_votes_df.groupby("Project Name")[['Total', 'Research', 'Tech', 'Deliverables', 'Output', 'Budget']].mean().reset_index()
-        summary_df = summary_df.round(2)
-        summary_df = summary_df.sort_values(by="Total", ascending=False)
+        summary_cols = ['Project Name', 'Trimmed Mean', 'Total', 'Median', 'Std', 'Z Mean'] + score_cols + ['Experts', 'Outlier Experts']
+        summary_df = pd.DataFrame(summary_rows, columns=summary_cols)
         
         st.dataframe(summary_df, use_container_width=True)
+        st.caption("排名按去极值均分（去掉一个最高分和一个最低分，不足 3 位专家时取平均）；"
+                   "Z Mean 为各专家分数按个人打分尺度标准化后的平均；Outlier Experts 为明显偏离项目中位数的专家。")
+
+        # 导出文件在点击下载时才逐批生成，列结构沿用 vote_default_cols
+        st.markdown("### 3️⃣ 导出结果")
+        export_sets = [
+            ("评分明细", "final_votes", store.votes, vote_default_cols),
+            ("平均分排名", "summary", store.summary, summary_cols),
+        ]
+        # 按文本写出的列（两组导出共用，各组只取自己有的列）；其余列按数值写出
+        text_cols = ['Project Name', 'Stage', 'Expert', 'Time', 'Outlier Experts']
+        for label, file_stem, get_rows, cols in export_sets:
+            export_ui = st.columns(len(EXPORT_FORMATS) + 1)
+            export_ui[0].markdown(f"**{label}**")
+            for col_ui, (fmt, (ext, mime, module)) in zip(export_ui[1:], EXPORT_FORMATS.items()):
+                available = format_available(fmt)
+                col_ui.download_button(
+                    f"⬇️ {fmt}",
+                    data=lambda fmt=fmt, get_rows=get_rows, cols=cols: export(fmt, get_rows(), cols, text_cols),
+                    file_name=f"{file_stem}.{ext}",
+                    mime=mime,
+                    key=f"export_{file_stem}_{ext}",
+                    on_click="ignore",
+                    disabled=not available,
+                    help=None if available else f"需要安装 {module}",
+                )
         
     else:
         st.info("暂无任何最终提交的打分数据。")
 
+    # 2.4 专家 × 项目 进度矩阵 (直接由完成度索引生成)
+    st.divider()
+    st.subheader("👥 专家评审进度")
+    
+    completion = store.completion()
+    if projects and completion:
+        project_names = [p['name'] for p in projects]
+        experts = sorted(completion)
+        column_of = {name: j for j, name in enumerate(project_names)}
+        matrix = np.zeros((len(experts), len(project_names)), dtype=bool)
+        for i, expert in enumerate(experts):
+            matrix[i, [column_of[name] for name in completion[expert] if name in column_of]] = True
+        
+        done_counts = matrix.sum(axis=1)
+        st.caption(f"共 {len(experts)} 位专家，其中 {int((done_counts == len(project_names)).sum())} 位已完成全部 {len(project_names)} 个项目的最终提交。")
+        with st.expander("📈 查看进度矩阵", expanded=False):
+            progress_df = pd.DataFrame(matrix, index=experts, columns=project_names)
+            progress_df.insert(0, "已完成", done_counts)
+            st.dataframe(progress_df, use_container_width=True)
+    else:
+        st.info("暂无专家提交最终评分。")
+
+    # 2.4.1 评审一致性：ICC、Kendall W、秩相关与专家偏差在后台线程中计算，页面只显示已完成的最新结果
+    st.divider()
+    st.subheader("🤝 评审一致性")
+    
+    reliability = get_reliability_jobs(active_round['id'], tuple(score_cols))
+    _, reliability_pending = reliability.refresh(store)
+    
+    @st.fragment(run_every=RELIABILITY_POLL_INTERVAL if reliability_pending else None)
+    def reliability_panel():
+        result, pending = reliability.refresh(store)
+        if reliability.error():
+            st.error(f"一致性分析失败：{reliability.error()}")
+        if result is None:
+            st.info("⏳ 正在计算评审一致性…")
+            return
+        if pending:
+            st.caption("⏳ 数据已更新，正在后台重新计算…（下方为上一次的结果）")
+        
+        def fmt(x):
+            return "—" if x is None else f"{x:.3f}"
+        
+        r1, r2, r3, r4 = st.columns(4)
+        r1.metric("ICC(2,1) 单个专家", fmt(result['icc_single']))
+        r2.metric("ICC(2,k) 专家平均", fmt(result['icc_average']))
+        r3.metric("Kendall W", fmt(result['kendall_w']))
+        r4.metric("平均 Spearman", fmt(result['mean_spearman']))
+        st.caption(
+            f"ICC 与 Kendall W 基于被 {len(result['experts'])} 位专家全部评过的 {result['projects']} 个项目；"
+            f"数据版本 {result['version']}，计算于 {datetime.fromtimestamp(result['computed_at']).strftime('%H:%M:%S')}"
+            f"（耗时 {result['seconds'] * 1000:.0f} 毫秒）。"
+        )
+        if result['bias']:
+            st.markdown("**专家偏差**（与其他专家对同一项目平均总分之差；正为偏松、负为偏严）")
+            bias_df = pd.DataFrame(result['bias']).rename(columns={
+                "expert": "专家", "projects": "评分项目数", "bias": "平均偏差", "abs_deviation": "平均绝对偏差",
+                "spearman": "与共识排序的 Spearman", "peer_spearman": "与其他专家的平均 Spearman",
+            })
+            st.dataframe(bias_df.round(3), hide_index=True, use_container_width=True)
+        with st.expander("各评分项 ICC 与专家两两秩相关", expanded=False):
+            st.dataframe(
+                pd.DataFrame(result['criteria']).rename(columns={
+                    "criterion": "评分项", "projects": "项目数", "icc_single": "ICC(2,1)", "icc_average": "ICC(2,k)",
+                }).round(3),
+                hide_index=True, use_container_width=True,
+            )
+            if result['weakest_pairs']:
+                # 专家多时两两组合数以万计，只列出一致性最差的几对
+                st.caption(f"共 {result['pairs']} 对专家有足够的共同项目，以下为秩相关最低的 {len(result['weakest_pairs'])} 对：")
+                st.dataframe(
+                    pd.DataFrame(result['weakest_pairs'], columns=["专家 A", "专家 B", "共同项目数", "Spearman"]).round(3),
+                    hide_index=True, use_container_width=True,
+                )
+    
+    reliability_panel()
+
+    # 2.5 性能监控 (进程内环形缓冲区中的最近阶段计时与读写计数)
+    st.divider()
+    st.subheader("⏱️ 性能监控")
+    
+    counters = monitor.counters()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("累计读取行数", counters.get("rows_read", 0))
+    m2.metric("累计写入行数", counters.get("rows_written", 0))
+    m3.metric("累计写盘", f"{counters.get('bytes_written', 0) / 1024:.1f} KB")
+    perf_stats = monitor.stats()
+    if perf_stats:
+        st.dataframe(pd.DataFrame(perf_stats), hide_index=True, use_container_width=True)
+    if monitor.export_paths:
+        st.caption(f"本进程的指标每 {METRICS_EXPORT_INTERVAL:.0f} 秒写出到 {' 与 '.join(monitor.export_paths)}（每个服务进程各写一份）。")
+    if monitor.export_error:
+        st.warning(f"指标文件写出失败（累计 {counters.get('metrics_export_errors', 0)} 次）：{monitor.export_error}")
+    
+    if SESSION_STATE_METRICS:
+        session_rows = get_session_meter().rows()
+        if session_rows:
+            session_bytes = [r['bytes'] for r in session_rows]
+            s1, s2, s3 = st.columns(3)
+            s1.metric("在线会话", len(session_rows))
+            s2.metric("平均每用户 session state", f"{sum(session_bytes) / len(session_bytes) / 1024:.1f} KB")
+            s3.metric("最大", f"{max(session_bytes) / 1024:.1f} KB")
+            st.dataframe(
+                pd.DataFrame(session_rows).rename(columns={
+                    "user": "用户", "role": "角色", "bytes": "字节数", "largest_key": "占用最大的键", "age_s": "上报距今(秒)",
+                }),
+                hide_index=True, use_container_width=True,
+            )
+            st.caption("测量模式（SESSION_STATE_METRICS=1）：各会话在每次重跑开始时上报自身 session state 的字节数。")
+
+    # 2.6 评审轮次：每轮数据独立分区，归档轮次按需只读加载
+    st.divider()
+    st.subheader("🗂️ 评审轮次")
+    st.caption(f"当前轮次：**{active_round['name']}**" + (f"（开始于 {active_round['created']}）" if active_round['created'] else ""))
+    
+    with st.expander("🆕 结束当前轮次并开启新轮次", expanded=False):
+        new_round_name = st.text_input("新轮次名称", key="new_round_name")
+        confirm_close = st.checkbox("我确认结束当前轮次：其项目与评分将归档为只读，新轮次从空白开始。", key="confirm_close_round")
+        if st.button("开启新轮次", disabled=not (new_round_name.strip() and confirm_close)):
+            # 结束时一次性预先计算汇总，之后浏览归档轮次无需加载其评分
+            new_round = round_manager.start_new_round(
+                new_round_name.strip(), store.summary(), len(store.projects()), store.vote_count()
+            )
+            # 写完上一轮次的暂存后清除缓存；存储与一致性分析在移出缓存时关闭（见 on_release）
+            draft_writer.close()
+            get_store.clear()
+            get_draft_writer.clear()
+            get_reliability_jobs.clear()
+            st.session_state['show_success'] = f"已开启新轮次 **{new_round['name']}**，上一轮次已归档。"
+            st.rerun()
+    
+    archived_rounds = round_manager.archived()
+    if archived_rounds:
+        archived_round = st.selectbox(
+            "浏览已归档轮次", archived_rounds,
+            format_func=lambda r: f"{r['name']}（结束于 {r['closed']}）", key="archived_round_select"
+        )
+        round_summary = round_manager.load_summary(archived_round)
+        if round_summary:
+            st.caption(f"共 {round_summary['projects']} 个项目、{round_summary['votes']} 条最终评分。")
+            st.dataframe(pd.DataFrame(round_summary['rows']), hide_index=True, use_container_width=True)
+        if st.toggle("加载该轮次的评分明细（只读）", key="load_archived_detail"):
+            archived_store = get_archived_store(archived_round['id'], archived_round['dir'], tuple(score_cols))
+            archived_projects = [p['name'] for p in archived_store.projects()]
+            if archived_projects:
+                archived_project = st.selectbox("选择项目", archived_projects, key="archived_project_select")
+                st.dataframe(
+                    pd.DataFrame(archived_store.votes_for_project(archived_project), columns=vote_default_cols),
+                    hide_index=True, use_container_width=True,
+                )
+            else:
+                st.info("该轮次没有项目。")
+    else:
+        st.info("暂无已归档的轮次。")
+
+    # 2.7 修订历史：回溯任一时刻的排名，查看两个时刻之间谁改了什么
+    st.divider()
+    st.subheader("🕓 评审历史")
+    
+    @st.fragment
+    def history_panel():
+        span = store.history.span()
+        if span is None or span[1] <= span[0]:
+            st.info("暂无修订记录。")
+            return
+        start, end = datetime.fromtimestamp(int(span[0])), datetime.fromtimestamp(int(span[1]) + 1)
+        slider_args = dict(min_value=start, max_value=end, step=timedelta(seconds=1), format="MM-DD HH:mm:ss")
+        
+        as_of = st.slider("回溯到", value=end, key="history_as_of", **slider_args)
+        state = store.history.state_at(as_of.timestamp())
+        if state is None:
+            st.info("该时间点早于历史记录起点。")
+        else:
+            projects_at, votes_at = state
+            ranking = VoteStore(SnapshotStorage(projects_at.values(), votes_at.values()), score_cols).summary()
+            st.dataframe(
+                pd.DataFrame(ranking, columns=['Project Name', 'Trimmed Mean', 'Total', 'Median', 'Experts']),
+                hide_index=True, use_container_width=True,
+            )
+            st.caption(f"{as_of:%m-%d %H:%M:%S} 时共 {len(projects_at)} 个项目、{len(votes_at)} 条最终评分。")
+        
+        diff_from, diff_to = st.slider("变更区间", value=(start, end), key="history_range", **slider_args)
+        changes = store.history.changes_between(diff_from.timestamp(), diff_to.timestamp())
+        if changes:
+            st.dataframe(
+                pd.DataFrame(
+                    [(datetime.fromtimestamp(when).strftime("%m-%d %H:%M:%S"), *rest) for when, *rest in changes],
+                    columns=['时间', '操作人', '项目', '专家', '变化', '原总分', '新总分'],
+                ),
+                hide_index=True, use_container_width=True,
+            )
+        else:
+            st.info("该区间内没有变更。")
+    
+    history_panel()
+
 # =================================================================
 #                           专家评审界面 
 # =================================================================
 elif user_type == "expert":
     st.header(f"📝 专家评审：{current_user_name}")
     
-    is_submitted = st.session_state['final_submitted'].get(current_user_name, False)
+    # 最终提交回调留下的错误（轮次已切换时新轮次可能还没有项目，因此放在最前面显示）
+    if st.session_state.get('submit_error'):
+        st.error(st.session_state.pop('submit_error'))
     
-    if not st.session_state['projects']:
+    # 锁定状态直接取自共享存储的完成度索引：已对全部项目有最终评分即视为已提交
+    is_submitted = store.is_complete(current_user_name)
+    projects = store.projects()
+    
+    if not projects:
         st.warning("管理员暂未发布评审项目。")
         
     # 如果全局已锁定，直接显示已完成
@@ -282,11 +679,7 @@ elif user_type == "expert":
         explicit_drafts = st.session_state['draft_votes'].get(current_user_name, {})
 
         # 2. 获取当前专家已提交的最终评分 (作为未显式暂存的草稿源)
-        submitted_final_votes = {
-            v['Project Name']: v 
-            for v in st.session_state['final_votes'] 
-            if v['Expert'] == current_user_name
-        }
+        submitted_final_votes = store.votes_for_expert(current_user_name)
         
         # 3. 合并：以 explicit_drafts 为准，形成完整的“待提交评分集合” (my_effective_drafts)
         # 这个集合是用于总览和最终提交检查的唯一真实来源。
@@ -299,77 +692,103 @@ elif user_type == "expert":
         st.divider()
         st.subheader("📋 评分总览与最终提交")
         
-        if st.session_state['projects']:
-            summary_data = []
-            project_names_list = []
+        if projects:
+            with monitor.phase("expert_overview"):
+                summary_data = []
+                project_names_list = []
             
-            for p in st.session_state['projects']:
-                p_name = p['name']
-                project_names_list.append(p_name)
+                for p in projects:
+                    p_name = p['name']
+                    project_names_list.append(p_name)
                 
-                # 状态判断基于 my_effective_drafts
-                if p_name in my_effective_drafts:
-                    effective_vote = my_effective_drafts[p_name]
-                    total = effective_vote['Total']
+                    # 状态判断基于 my_effective_drafts
+                    if p_name in my_effective_drafts:
+                        effective_vote = my_effective_drafts[p_name]
+                        total = effective_vote['Total']
                     
-                    # 状态显示：
-                    if p_name in explicit_drafts:
-                        status = "💾 已暂存" 
-                    elif p_name in submitted_final_votes:
-                        # 只有在 global is_submitted=False 且项目未被重新暂存时，才显示此状态
-                        status = "✅ 已提交" 
-                    else:
-                         status = "⏳ 待评分" # 理论上不发生
+                        # 状态显示：
+                        if p_name in explicit_drafts:
+                            status = "💾 已暂存" 
+                        elif p_name in submitted_final_votes:
+                            # 只有在 global is_submitted=False 且项目未被重新暂存时，才显示此状态
+                            status = "✅ 已提交" 
+                        else:
+                             status = "⏳ 待评分" # 理论上不发生
                          
-                else:
-                    status = "⏳ 待评分"
-                    total = 0
+                    else:
+                        status = "⏳ 待评分"
+                        total = 0
                 
-                summary_data.append({
-                    "项目名称": p_name,
-                    "阶段": p['stage'],
-                    "当前总分": total,
-                    "状态": status,
-                })
-            
-            summary_df = pd.DataFrame(summary_data)
+                    summary_data.append({
+                        "项目名称": p_name,
+                        "阶段": p['stage'],
+                        "当前总分": total,
+                        "状态": status,
+                    })
             
-            # 1. 显示简化后的总览表
-            st.dataframe(summary_df, hide_index=True, use_container_width=True)
+                # 1. 显示简化后的总览表（Markdown 表格，专家页无需为表格组件导入 pandas / pyarrow）
+                overview_lines = ["| 项目名称 | 阶段 | 当前总分 | 状态 |", "| --- | --- | ---: | --- |"]
+                overview_lines += [
+                    "| " + " | ".join(str(row[col]).replace("|", "\\|") for col in ("项目名称", "阶段", "当前总分", "状态")) + " |"
+                    for row in summary_data
+                ]
+                st.markdown("\n".join(overview_lines))
             
             # 2. 最终提交按钮
-            all_scored = len(my_effective_drafts) == len(st.session_state['projects'])
+            all_scored = len(my_effective_drafts) == len(projects)
+            
+            def submit_final_votes(expert_name, vote_list, carried, base_version, round_id):
+                """最终提交回调：按渲染总览时读到的数据版本做乐观提交，期间他人的修改自动合并。
+
+                round_id 为渲染按钮时的轮次；管理员在此期间开启了新轮次时拒绝提交，不写入已归档的轮次。
+                """
+                # 提交前进行最终验证 (针对当前选中的项目)
+                if st.session_state['current_errors']:
+                    st.session_state['submit_error'] = "最终提交失败：请先修正当前选定项目中的所有评分错误。"
+                    return
+                round_closed = "最终提交未完成：当前评审轮次已结束并归档，本次评分没有写入。请刷新页面，在新轮次中重新评分。"
+                if round_manager.active()['id'] != round_id:
+                    st.session_state['submit_error'] = round_closed
+                    return
+                try:
+                    # 核心逻辑：在共享存储中替换本专家的最终评分（只向日志追加本次提交的行）
+                    store.submit_expert_votes(expert_name, vote_list, base_version, carried)
+                except PermissionError:
+                    # 检查轮次之后、写入之前轮次恰好被关闭：存储已拒绝写入
+                    st.session_state['submit_error'] = round_closed
+                    return
+                except SubmitConflict as conflict:
+                    # 已删除项目的暂存已无意义，直接丢弃；被清空的项目需专家重新评分
+                    drafts = st.session_state['draft_votes'].setdefault(expert_name, {})
+                    for name in conflict.deleted:
+                        drafts.pop(name, None)
+                    draft_writer.save(expert_name, drafts)
+                    st.session_state['submit_error'] = f"最终提交未完成，数据在您评审期间发生了变化：{conflict}"
+                    return
+                # 提交成功后，清除所有暂存分数，防止下次误用（完成度索引已随写入更新）
+                st.session_state['draft_votes'][expert_name] = {}
+                draft_writer.save(expert_name, {})
+                st.session_state['show_success'] = "所有评分已成功提交！"
             
             if all_scored:
                 st.markdown("---")
-                st.warning(f"⚠️ **请确认所有 {len(st.session_state['projects'])} 个项目评分准确无误。** 提交后将无法修改。")
+                st.warning(f"⚠️ **请确认所有 {len(projects)} 个项目评分准确无误。** 提交后将无法修改。")
                 
-                # 使用单个按钮直接提交
-                if st.button("最终确认并提交所有评分", key="final_submission_button", type="primary", help="提交后将无法修改，并向管理员报送最终分数。"):
-                    # 提交前进行最终验证 (针对当前选中的项目)
-                    if st.session_state['current_errors']:
-                        st.error("最终提交失败：请先修正当前选定项目中的所有评分错误。")
-                        st.stop()
-                        
-                    final_vote_list = list(my_effective_drafts.values()) # <--- 使用合并后的集合进行提交
-                    
-                    # 核心逻辑：更新 final_votes
-                    st.session_state['final_votes'] = [
-                        v for v in st.session_state['final_votes'] if v['Expert'] != current_user_name
-                    ]
-                    st.session_state['final_votes'].extend(final_vote_list)
-                    
-                    # 3. 保存数据到文件
-                    save_data(pd.DataFrame(st.session_state['final_votes']), FINAL_VOTES_FILE)
-                    
-                    # 4. 更新状态并刷新
-                    st.session_state['final_submitted'][current_user_name] = True
-                    # 提交成功后，清除所有暂存分数，防止下次误用
-                    st.session_state['draft_votes'][current_user_name] = {}
-                    st.session_state['show_success'] = "所有评分已成功提交！"
-                    st.rerun() 
+                # 使用单个按钮直接提交：回调参数固定为本次渲染时的评分集合与数据版本
+                st.button(
+                    "最终确认并提交所有评分", key="final_submission_button", type="primary",
+                    help="提交后将无法修改，并向管理员报送最终分数。",
+                    on_click=submit_final_votes,
+                    args=(
+                        current_user_name,
+                        list(my_effective_drafts.values()),  # <--- 使用合并后的集合进行提交
+                        [name for name in submitted_final_votes if name not in explicit_drafts],
+                        store.version,
+                        active_round['id'],
+                    ),
+                )
             else:
-                st.warning(f"请先完成所有 {len(st.session_state['projects'])} 个项目的评分暂存，当前已完成 **{len(my_effective_drafts)}** 个。")
+                st.warning(f"请先完成所有 {len(projects)} 个项目的评分暂存，当前已完成 **{len(my_effective_drafts)}** 个。")
         
         st.divider()
         
@@ -377,9 +796,13 @@ elif user_type == "expert":
         # 4. 详细评分界面 (文本输入与实时验证)
         # -------------------------------------------------------------
         
-        if st.session_state['projects']:
+        # 评分面板作为独立片段运行：输入分数时只重跑该面板（实时校验与总分），
+        # 暂存后再触发整页刷新以更新上方总览。
+        @st.fragment
+        def scoring_panel(expert_name, projects, project_names_list, my_effective_drafts, submitted_final_votes, explicit_drafts):
+            """单个项目的评分录入、实时校验与暂存。"""
             # 默认选择逻辑
-            default_name = next((p['name'] for p in st.session_state['projects'] if p['name'] not in my_effective_drafts), st.session_state['projects'][0]['name'])
+            default_name = next((p['name'] for p in projects if p['name'] not in my_effective_drafts), projects[0]['name'])
             default_index = project_names_list.index(default_name)
             
             selected_project_name = st.selectbox(
@@ -390,7 +813,7 @@ elif user_type == "expert":
                 help="在上方总览表查看评分状态，在此选择项目进行详细评分或修改。",
             )
             
-            project_data = next((p for p in st.session_state['projects'] if p['name'] == selected_project_name), None)
+            project_data = store.get_project(selected_project_name)
             
             if project_data:
                 stage_type = project_data['stage']
@@ -411,25 +834,24 @@ elif user_type == "expert":
                 if project_is_locked:
                     st.warning("🔒 **此项目评分已最终提交，无法修改或暂存。** 若需修改，请联系管理员清空本项目的最终评分。")
                 
-                # 定义评分标准
-                rubric = CRITERIA[stage_type]
+                if stage_type not in RUBRICS:
+                    # 旧数据或评分标准改名、删除了该阶段：只影响这一个项目，不让整个评分页出错
+                    st.error(
+                        f"评分标准 {RUBRICS_FILE} 中没有“{stage_type}”阶段，暂时无法为该项目评分。"
+                        f"请联系管理员修改项目阶段（可选 {'/'.join(RUBRICS.stages)}）或补充评分标准。"
+                    )
+                    return
+                # 该阶段编译好的评分标准（配置文件未变时直接复用）
+                rubric = RUBRICS[stage_type]
+                criteria_keys = rubric.keys
                 
                 # 使用合并后的有效评分作为初始草稿源
                 initial_draft_source = my_effective_drafts.get(selected_project_name, {})
                 
-                criteria_keys = ['Research', 'Tech', 'Deliverables', 'Output', 'Budget']
-                rubric_map = {
-                    'Research': rubric['research'], 'Tech': rubric['tech'], 'Deliverables': rubric['deliverables'],
-                    'Output': rubric['output'], 'Budget': rubric['budget']
-                }
-                display_map = {
-                    'Research': 1, 'Tech': 2, 'Deliverables': 3, 'Output': 4, 'Budget': 5
-                }
-                
                 # --- 初始化 live_scores ---
                 def get_initial_value(key, initial_draft):
                     """获取初始值。如果有暂存数据则返回，否则返回空字符串。"""
-                    if key in initial_draft:
+                    if initial_draft.get(key) is not None:
                         return str(initial_draft[key])
                     return ""
                     
@@ -440,70 +862,52 @@ elif user_type == "expert":
                     st.session_state['live_scores'] = {
                         key: get_initial_value(key, initial_draft_source) for key in criteria_keys
                     }
+                    # 同步输入框自身的状态，否则输入框会沿用上一个项目的值
+                    for key in criteria_keys:
+                        st.session_state[f"text_input_{key}"] = st.session_state['live_scores'][key]
                         
                     st.session_state['last_selected_project'] = selected_project_name
                     st.session_state['current_errors'] = []
                 
                 # --- 实时验证和计算总分 ---
-                valid_scores = {}
-                current_errors = []
-
-                # 仅在项目未锁定时才进行实时验证
-                if not project_is_locked:
-                    for key in criteria_keys:
-                        # 从 session state 获取 text_input 的当前值
-                        input_key = f"text_input_{key}"
-                        input_value_str = st.session_state.get(input_key, st.session_state['live_scores'].get(key, ""))
-                        
-                        max_val = rubric_map[key]['max']
-                        
-                        try:
-                            # 尝试转换为整数
-                            score = int(input_value_str)
-                            if 0 <= score <= max_val:
-                                valid_scores[key] = score
-                                st.session_state['live_scores'][key] = str(score) 
-                            else:
-                                current_errors.append(f"❌ {rubric_map[key]['name']}：分数必须是 0 到 {max_val} 之间的整数。您输入了 {input_value_str}。")
-                                valid_scores[key] = 0 
-                        except ValueError:
-                            if input_value_str.strip() == "":
-                                valid_scores[key] = 0 
-                                st.session_state['live_scores'][key] = "" 
-                            else:
-                                current_errors.append(f"❌ {rubric_map[key]['name']}：输入值 '{input_value_str}' 必须是整数。")
-                                valid_scores[key] = 0
-                                
-                    live_total_score = sum(valid_scores.values())
-                    st.session_state['current_errors'] = current_errors # 存储错误列表
-                else:
-                    # 如果项目锁定，分数取自 initial_draft_source，且不产生错误
-                    valid_scores = {key: initial_draft_source.get(key, 0) for key in criteria_keys}
-                    live_total_score = initial_draft_source.get('Total', 0)
-                    st.session_state['current_errors'] = []
+                with monitor.phase("validation"):
+                    # 仅在项目未锁定时才进行实时验证
+                    if not project_is_locked:
+                        # 从 session state 获取各 text_input 的当前值
+                        inputs = {
+                            key: st.session_state.get(f"text_input_{key}", st.session_state['live_scores'].get(key, ""))
+                            for key in criteria_keys
+                        }
+                        valid_scores, input_errors = rubric.validate(inputs)
+                        for key in criteria_keys:
+                            if key not in input_errors:
+                                st.session_state['live_scores'][key] = str(valid_scores[key]) if inputs[key].strip() else ""
+                        live_total_score = rubric.total(valid_scores)
+                        st.session_state['current_errors'] = list(input_errors.values()) # 存储错误列表
+                    else:
+                        # 如果项目锁定，分数取自 initial_draft_source，且不产生错误
+                        valid_scores = {key: initial_draft_source.get(key, 0) for key in criteria_keys}
+                        live_total_score = initial_draft_source.get('Total', 0)
+                        st.session_state['current_errors'] = []
 
                 # --- 显示错误和实时总分 ---
                 if st.session_state['current_errors']:
                     st.error("请修正以下所有评分错误，否则无法暂存：\n" + "\n".join(st.session_state['current_errors']))
 
-                st.markdown(f"#### 🚀 当前实时总分: **{live_total_score}** / 100 分")
+                st.markdown(f"#### 🚀 当前实时总分: **{live_total_score}** / {rubric.max_total} 分")
 
                 st.markdown(f"### {stage_type}评分标准")
                 
                 # --- 文本框定义 ---
-                for key in criteria_keys:
-                    max_val = rubric_map[key]['max']
-                    display_num = display_map[key]
-                    
-                    # 禁用输入框
+                for display_num, criterion in enumerate(rubric.criteria, start=1):
+                    # 输入框的值由 session_state 中的同名键管理（切换项目时已同步）；锁定时禁用输入框
                     st.text_input(
-                        label=f"{display_num}. {rubric_map[key]['name']} (最高 {max_val} 分)",
-                        value=st.session_state['live_scores'].get(key, ""), 
-                        key=f"text_input_{key}",
-                        help=rubric_map[key]['tips'],
+                        label=f"{display_num}. {criterion.title} (最高 {criterion.max} 分)",
+                        key=f"text_input_{criterion.key}",
+                        help=criterion.tips,
                         disabled=project_is_locked # <-- 项目级锁定
                     )
-                    st.caption(rubric_map[key]['desc'])
+                    st.caption(criterion.desc)
                 
                 # --- 暂存表单 ---
                 with st.form("grading_form"):
@@ -525,23 +929,24 @@ elif user_type == "expert":
                             st.stop()
                             
                         # 如果没有错误，保存到 explicit_drafts (st.session_state['draft_votes'])
-                        vote_record = {
+                        vote_record = compact_vote({
                             "Project Name": selected_project_name,
                             "Stage": stage_type,
-                            "Expert": current_user_name,
-                            "Research": valid_scores['Research'],
-                            "Tech": valid_scores['Tech'],
-                            "Deliverables": valid_scores['Deliverables'],
-                            "Output": valid_scores['Output'],
-                            "Budget": valid_scores['Budget'],
+                            "Expert": expert_name,
+                            **valid_scores,
                             "Total": live_total_score, 
                             "Time": datetime.now().strftime("%Y-%m-%d %H:%M")
-                        }
+                        }, vote_default_cols)
                         
-                        st.session_state['draft_votes'][current_user_name][selected_project_name] = vote_record
+                        st.session_state['draft_votes'].setdefault(expert_name, {})[selected_project_name] = vote_record
+                        # 交给后台线程落盘，按钮立即返回
+                        draft_writer.save(expert_name, st.session_state['draft_votes'][expert_name])
                         st.session_state['show_success'] = f"项目 **{selected_project_name}** 评分已暂存！总分：{live_total_score}"
                         st.rerun() 
 
+        if projects:
+            scoring_panel(current_user_name, projects, project_names_list, my_effective_drafts, submitted_final_votes, explicit_drafts)
+
 # =================================================================
 #                             未登录状态
 # =================================================================
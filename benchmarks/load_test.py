@@ -0,0 +1,222 @@
+"""评审日负载测试：用 Streamlit AppTest 模拟 N 位专家 × M 个项目驱动 app.py。
+
+每位专家依次登录、逐个项目选择并输入该阶段评分标准（rubrics.json）的各项分数、暂存，最后最终提交；
+期间管理员会话反复查看汇总页，并定期清空某个项目的评分。
+统计每类交互的重跑耗时 p50/p95/p99、每次交互写盘字节数（Linux /proc/self/io 的 wchar）与峰值 RSS。
+
+用法（离线即可运行，数据写在临时目录，不会改动仓库中的 CSV）：
+
+    python benchmarks/load_test.py --experts 5 --projects 10
+    python benchmarks/load_test.py --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --check benchmarks/baseline.json --tolerance 0.25
+
+--check 模式下任一指标比基线差超过容差即以退出码 1 结束。
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bytes_written():
+    """本进程累计写出的字节数；非 Linux 平台返回 None。"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self):
+        self.latency = defaultdict(list)  # 交互名称 -> [毫秒]
+        self.written = defaultdict(list)  # 交互名称 -> [字节]
+
+    def run(self, name, action):
+        before = bytes_written()
+        start = time.perf_counter()
+        at = action()
+        self.latency[name].append((time.perf_counter() - start) * 1000)
+        after = bytes_written()
+        if before is not None and after is not None:
+            self.written[name].append(after - before)
+        if at is not None and at.exception:
+            raise RuntimeError(f"{name} 运行出错: {[e.value for e in at.exception]}")
+        return at
+
+    def report(self):
+        result = {}
+        for name, values in self.latency.items():
+            written = self.written.get(name) or [0]
+            result[name] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "bytes_per_action": round(sum(written) / len(written), 1),
+            }
+        return result
+
+
+def by_label(widgets, label):
+    for w in widgets:
+        if w.label == label or w.label.startswith(label):
+            return w
+    raise LookupError(f"找不到控件: {label}")
+
+
+def prepare_workdir(n_projects, backend):
+    workdir = tempfile.mkdtemp(prefix="ess-bench-")
+    for path in glob.glob(os.path.join(APP_DIR, "*.py")) + glob.glob(os.path.join(APP_DIR, "*.json")):
+        shutil.copy(path, workdir)
+    with open(os.path.join(workdir, "projects.csv"), "w", encoding="utf-8") as f:
+        f.write("name,applicant,stage,time\n")
+        for i in range(n_projects):
+            f.write(f"项目{i:04d},申请人{i},{'中期' if i % 2 else '结题'},30\n")
+    os.environ["STORAGE_BACKEND"] = backend
+    os.chdir(workdir)
+    return workdir
+
+
+def simulate(args):
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+    from rubrics import load_rubrics
+
+    # 屏蔽告警日志，避免日志输出被计入写盘字节
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    workdir = prepare_workdir(args.projects, args.backend)
+    rubrics = load_rubrics(os.path.join(workdir, "rubrics.json"))
+    st.cache_resource.clear()
+    script = os.path.join(workdir, "app.py")
+    rng = random.Random(args.seed)
+    rec = Recorder()
+
+    def new_session():
+        at = AppTest.from_file(script, default_timeout=args.timeout)
+        return rec.run("session_start", at.run)
+
+    admin = new_session()
+    by_label(admin.sidebar.radio, "选择角色").set_value("管理员")
+    by_label(admin.sidebar.text_input, "请输入密码").set_value("admin")
+    rec.run("admin_login", by_label(admin.sidebar.button, "登录").click().run)
+
+    project_names = [f"项目{i:04d}" for i in range(args.projects)]
+    project_criteria = {name: rubrics['中期' if i % 2 else '结题'].criteria for i, name in enumerate(project_names)}
+    for e in range(args.experts):
+        expert = new_session()
+        by_label(expert.sidebar.text_input, "请输入您的姓名").set_value(f"专家{e:03d}")
+        by_label(expert.sidebar.text_input, "请输入密码").set_value("123")
+        rec.run("expert_login", by_label(expert.sidebar.button, "登录").click().run)
+
+        for name in project_names:
+            rec.run("select_project", expert.selectbox(key="project_selector").set_value(name).run)
+            for criterion in project_criteria[name]:
+                expert.text_input(key=f"text_input_{criterion.key}").set_value(str(rng.randint(0, criterion.max)))
+                rec.run("type_score", expert.run)
+            rec.run("save_draft", expert.button(key="FormSubmitter:grading_form-💾 暂存评分").click().run)
+        rec.run("final_submit", expert.button(key="final_submission_button").click().run)
+
+        rec.run("admin_view", admin.run)
+        if args.clear_every and (e + 1) % args.clear_every == 0:
+            # 先重跑一次，让“清空 … 评分”按钮的标签（也就是控件 ID）对应新选中的项目，否则点击会被丢弃
+            target = rng.choice(project_names)
+            admin.selectbox(key="manage_project_select").set_value(target).run()
+            rec.run("admin_clear", by_label(admin.button, f"清空 {target} 评分").click().run)
+            if not any(f"**{target}** 的" in t.value and "已清空" in t.value and " 0 条" not in t.value for t in admin.toast):
+                raise RuntimeError(f"管理员清空 {target} 的评分未生效")
+
+    report = {
+        "params": {"experts": args.experts, "projects": args.projects, "backend": args.backend},
+        "interactions": rec.report(),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    os.chdir(APP_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    print(f"参数: {report['params']}    峰值 RSS: {report['peak_rss_mb']} MB")
+    print(f"{'交互':<16}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'写盘(B/次)':>14}")
+    for name, m in report["interactions"].items():
+        print(f"{name:<16}{m['count']:>8}{m['p50_ms']:>10}{m['p95_ms']:>10}{m['p99_ms']:>10}{m['bytes_per_action']:>14}")
+
+
+def compare(report, baseline, tolerance):
+    """返回超出容差的指标列表。耗时比较 p95，另比较写盘字节与峰值 RSS。"""
+    regressions = []
+    for name, base in baseline["interactions"].items():
+        cur = report["interactions"].get(name)
+        if cur is None:
+            continue
+        for metric in ("p95_ms", "bytes_per_action"):
+            # 对极小的基线值留出绝对余量，避免噪声误报
+            slack = 5 if metric == "p95_ms" else 256
+            if cur[metric] > base[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {cur[metric]}")
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {baseline['peak_rss_mb']} -> {report['peak_rss_mb']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--experts", type=int, default=5, help="模拟专家数 N")
+    parser.add_argument("--projects", type=int, default=10, help="项目数 M")
+    parser.add_argument("--clear-every", type=int, default=2, help="每多少位专家提交后管理员清空一次项目评分，0 表示不清空")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="单次重跑的超时（秒）")
+    parser.add_argument("--json", help="把结果另存为 JSON")
+    parser.add_argument("--save-baseline", metavar="FILE", help="把本次结果保存为基线")
+    parser.add_argument("--check", metavar="FILE", help="与基线比较，变差超过容差时返回非零退出码")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="回归判定容差（相对比例）")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, APP_DIR)
+    report = simulate(args)
+    print_report(report)
+
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("性能回归：")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("未发现性能回归。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""冷启动基准：在全新的 Python 进程中测量导入耗时与首屏渲染耗时，可与任一 git 版本对比。
+
+每次测量都启动一个新进程（模拟容器刚被回收后的第一位访问者），依次记录：
+
+- import_ms：导入数据层（storage、store）的耗时，不含 Streamlit 本身
+- first_render_ms：登录页首次渲染（执行 app.py 顶层代码、加载项目与评分）
+- expert_render_ms：专家登录后评审页的首次渲染
+- cold_start_ms：从进程启动到登录页渲染完成
+- pandas / numpy：专家评审页渲染完成时进程中是否已导入 pandas、numpy
+
+用法（离线即可运行，数据写在临时目录）：
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --ref HEAD~1 --repeat 7 --projects 500 --experts 40
+
+--ref 指定的版本通过 git archive 导出到临时目录，与当前工作区用相同的数据各测一遍。
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ["import_ms", "first_render_ms", "expert_render_ms", "cold_start_ms"]
+
+# 在新进程中执行的测量脚本，结果以一行 JSON 输出。导入耗时单独起进程测量，避免影响渲染测量。
+IMPORT_PROBE = r"""
+import json, time
+import streamlit
+t = time.perf_counter()
+import storage, store
+print(json.dumps({"import_ms": (time.perf_counter() - t) * 1000}))
+"""
+
+RENDER_PROBE = r"""
+import time
+START = time.perf_counter()
+import json, logging, sys, warnings
+from streamlit.testing.v1 import AppTest
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+def by_label(widgets, label):
+    return next(w for w in widgets if w.label.startswith(label))
+
+at = AppTest.from_file("app.py", default_timeout=300)
+t = time.perf_counter()
+at.run()
+first_render_ms = (time.perf_counter() - t) * 1000
+cold_start_ms = (time.perf_counter() - START) * 1000
+by_label(at.sidebar.text_input, "请输入您的姓名").set_value("专家000")
+by_label(at.sidebar.text_input, "请输入密码").set_value("123")
+t = time.perf_counter()
+by_label(at.sidebar.button, "登录").click().run()
+expert_render_ms = (time.perf_counter() - t) * 1000
+if at.exception:
+    raise SystemExit(f"渲染出错: {[e.value for e in at.exception]}")
+print(json.dumps({"first_render_ms": first_render_ms, "expert_render_ms": expert_render_ms,
+                  "cold_start_ms": cold_start_ms, "pandas": "pandas" in sys.modules, "numpy": "numpy" in sys.modules}))
+"""
+
+
+def export_tree(ref):
+    """把 git 版本 ref 的源码导出到临时目录。"""
+    target = tempfile.mkdtemp(prefix="ess-startup-ref-")
+    archive = subprocess.run(["git", "-C", APP_DIR, "archive", ref], check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def prepare_workdir(source_dir, n_projects, n_experts):
+    """复制源码并生成示例数据：n_projects 个项目，每位专家对全部项目都有最终评分。"""
+    workdir = tempfile.mkdtemp(prefix="ess-startup-")
+    for path in glob.glob(os.path.join(source_dir, "*.py")) + glob.glob(os.path.join(source_dir, "*.json")):
+        shutil.copy(path, workdir)
+    with open(os.path.join(workdir, "projects.csv"), "w", encoding="utf-8") as f:
+        f.write("name,applicant,stage,time\n")
+        for i in range(n_projects):
+            f.write(f"项目{i:04d},申请人{i},{'中期' if i % 2 else '结题'},30\n")
+    with open(os.path.join(workdir, "final_votes.csv"), "w", encoding="utf-8") as f:
+        f.write("Project Name,Stage,Expert,Research,Tech,Deliverables,Output,Budget,Total,Time\n")
+        for e in range(1, n_experts + 1):
+            for i in range(n_projects):
+                r = (i + e) % 21
+                f.write(f"项目{i:04d},{'中期' if i % 2 else '结题'},专家{e:03d},{r},20,15,15,8,{r + 58},2024-01-01 09:00\n")
+    return workdir
+
+
+def measure(workdir, repeat):
+    """在 workdir 中重复 repeat 次冷启动测量，返回各指标的中位数。"""
+    runs = []
+    for _ in range(repeat):
+        run = {}
+        for probe in (IMPORT_PROBE, RENDER_PROBE):
+            out = subprocess.run([sys.executable, "-c", probe], cwd=workdir, capture_output=True, text=True)
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "测量进程异常退出")
+            run.update(json.loads(out.stdout.strip().splitlines()[-1]))
+        runs.append(run)
+    result = {m: round(statistics.median(r[m] for r in runs), 1) for m in METRICS}
+    for module in ("pandas", "numpy"):
+        result[module] = any(r.get(module, False) for r in runs)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ref", help="对比的 git 版本（如 HEAD~1）；不指定则只测当前工作区")
+    parser.add_argument("--repeat", type=int, default=5, help="每个版本的测量次数（取中位数）")
+    parser.add_argument("--projects", type=int, default=200, help="示例数据的项目数")
+    parser.add_argument("--experts", type=int, default=30, help="示例数据中已提交评分的专家数")
+    parser.add_argument("--json", help="把结果另存为 JSON")
+    args = parser.parse_args(argv)
+
+    sources = [("当前工作区", APP_DIR, False)]
+    if args.ref:
+        sources.insert(0, (args.ref, export_tree(args.ref), True))
+
+    results = {}
+    for label, source_dir, temporary in sources:
+        workdir = prepare_workdir(source_dir, args.projects, args.experts)
+        try:
+            results[label] = measure(workdir, args.repeat)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            if temporary:
+                shutil.rmtree(source_dir, ignore_errors=True)
+
+    print(f"参数: projects={args.projects} experts={args.experts} repeat={args.repeat}（各指标为中位数，毫秒）")
+    print(f"{'版本':<14}" + "".join(f"{m:>18}" for m in METRICS) + f"{'pandas':>8}{'numpy':>8}")
+    for label, r in results.items():
+        print(f"{label:<14}" + "".join(f"{r[m]:>18}" for m in METRICS)
+              + "".join(f"{'是' if r[module] else '否':>8}" for module in ("pandas", "numpy")))
+    if len(results) == 2:
+        before, after = results.values()
+        print(f"{'变化':<14}" + "".join(f"{after[m] - before[m]:>+18.1f}" for m in METRICS))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
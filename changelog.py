@@ -0,0 +1,140 @@
+import json
+import os
+from contextlib import contextmanager
+
+from perf import monitor
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为只在进程内串行写入
+    fcntl = None
+
+
+class ChangeLog:
+    """多进程共享的变更日志，用于多个 Streamlit 进程之间的缓存一致性。
+
+    每次写操作都在跨进程文件锁内完成：先追上其他进程的变更，再持久化，
+    最后把事件追加为一行 {"seq": 全局序号, "event": 事件}。
+    各进程记住已应用到的序号和日志读取位置，poll() 在没有新变更时只需一次 os.stat，
+    有新变更时只读取新增的行，由调用方把事件增量应用到内存索引。
+    日志超过 rotate_bytes 时由写者替换为只含表头 {"base": 序号} 的新文件；
+    读者先读完旧文件的剩余部分再切换，只有错过了整段日志才需要全量重新加载。
+    """
+
+    def __init__(self, path, rotate_bytes=4 * 1024 * 1024):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.rotate_bytes = rotate_bytes
+        self.seq = 0           # 本进程已应用到的全局序号
+        self._file = None      # 当前日志文件的读句柄
+        self._ino = None
+        self._buffer = b""     # 读到的不完整末行（写者尚未写完）
+        self._lock_file = None
+        self._depth = 0        # 写锁可重入：同一线程嵌套加锁时只在最外层 flock
+
+    @contextmanager
+    def locked(self):
+        """跨进程写锁（flock 咨询锁），同一时刻只有一个进程在写；调用方需已持有进程内的锁。"""
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._lock_file = open(self.lock_path, 'ab')
+        if fcntl and not self._depth:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if fcntl and not self._depth:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _open(self):
+        """打开当前日志文件并返回表头中的起始序号，文件不存在时返回 None。"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        base = json.loads(f.readline())['base']
+        self._file, self._ino, self._buffer = f, os.fstat(f.fileno()).st_ino, b""
+        return base
+
+    def _drain(self):
+        """读出当前文件中新增的完整行。"""
+        data = self._buffer + self._file.read()
+        lines = data.split(b"\n")
+        self._buffer = lines.pop()
+        monitor.count("changelog_bytes_read", len(data))
+        return [json.loads(line) for line in lines if line]
+
+    def poll(self):
+        """返回 (其他进程新写入的事件列表, 是否需要全量重新加载)。"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        if self._file is not None and st.st_ino == self._ino and st.st_size == self._file.tell():
+            return [], False
+
+        events, reset = [], False
+        if self._file is not None:
+            reset = self._consume(self._drain(), events)
+            if st.st_ino != self._ino:
+                self._file.close()
+                self._file = None
+        if self._file is None:
+            base = self._open()
+            if base is None:
+                return events, reset
+            # 新文件的起点晚于本进程已应用的位置，说明中间整段日志已被轮换掉
+            if base > self.seq:
+                reset, self.seq = True, base
+            reset = self._consume(self._drain(), events) or reset
+        return events, reset
+
+    def _consume(self, records, events):
+        """把序号新于本进程的事件追加到 events，出现序号断档时返回 True。"""
+        gap = False
+        for r in records:
+            if r['seq'] <= self.seq:
+                continue
+            gap = gap or r['seq'] != self.seq + 1
+            events.append(r['event'])
+            self.seq = r['seq']
+        return gap
+
+    def skip_to_end(self):
+        """跳过日志中已有的全部事件（全量加载之后调用，需持有写锁）。"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.seq = 0
+        self.poll()
+
+    def append(self, event):
+        """追加一条本进程的事件（需持有写锁，且已通过 poll() 追上最新序号）。"""
+        if self._file is None or os.path.getsize(self.path) >= self.rotate_bytes:
+            self._rotate()
+        self.seq += 1
+        data = (json.dumps({"seq": self.seq, "event": event}, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self._drain()  # 读句柄越过自己刚写的行
+        monitor.count("bytes_written", len(data))
+
+    def close(self):
+        """关闭读句柄与锁文件（之后再次使用时会重新打开）。"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None and not self._depth:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _rotate(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write((json.dumps({"base": self.seq}) + "\n").encode('utf-8'))
+        os.replace(tmp_path, self.path)
+        if self._file is not None:
+            self._file.close()
+        self._open()
@@ -0,0 +1,87 @@
+import atexit
+import json
+import os
+import threading
+from urllib.parse import quote
+
+from perf import monitor
+
+
+class DraftWriter:
+    """专家暂存评分的后台写入器（write-behind）。
+
+    save() 只把该专家最新的暂存集合放入待写队列后立即返回；
+    后台线程每隔 flush_interval 秒把队列中的专家各写一次（同一专家的多次暂存合并为一次写入），
+    每位专家一个 JSON 文件，先写临时文件再替换。
+    因此进程意外退出时最多丢失最近 flush_interval 秒内的暂存；正常退出时 atexit 会把队列写完。
+    """
+
+    def __init__(self, directory, flush_interval=2.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._pending = {}  # 专家 -> 待写入的暂存集合 {项目名称: 评分记录}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="draft-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _path(self, expert):
+        return os.path.join(self.directory, quote(expert, safe='') + ".json")
+
+    def save(self, expert, drafts):
+        """登记该专家当前的全部暂存评分，不阻塞调用方。"""
+        with self._lock:
+            self._pending[expert] = dict(drafts)
+
+    def load(self, expert):
+        """读取该专家的暂存评分（优先取尚未落盘的最新版本）。"""
+        with self._lock:
+            if expert in self._pending:
+                return dict(self._pending[expert])
+        try:
+            with open(self._path(expert), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def flush(self):
+        """把待写队列全部落盘。"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for expert, drafts in pending.items():
+            try:
+                self._write(expert, drafts)
+            except OSError:
+                # 写失败则放回队列，下一轮重试（期间若有更新的暂存则以更新的为准）
+                with self._lock:
+                    self._pending.setdefault(expert, drafts)
+
+    def _write(self, expert, drafts):
+        path = self._path(expert)
+        if not drafts:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = f"{path}.tmp"
+        # 会话中的暂存为紧凑记录（VoteRow），写出前转为普通字典
+        data = json.dumps({name: dict(v) for name, v in drafts.items()}, ensure_ascii=False, default=str).encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        monitor.count("rows_written", len(drafts))
+        monitor.count("bytes_written", len(data))
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """停止后台线程并写完剩余的暂存（进程退出时自动调用）。"""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
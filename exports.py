@@ -0,0 +1,91 @@
+import csv
+import importlib.util
+import io
+from itertools import islice
+
+CHUNK_ROWS = 5000  # 每批写出的行数，导出时同时驻留内存的中间数据不超过一批
+
+EXPORT_FORMATS = {
+    # 格式: (文件扩展名, MIME 类型, 依赖的可选模块)
+    "CSV": ("csv", "text/csv", None),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "pyarrow"),
+}
+
+
+def format_available(fmt):
+    """该导出格式依赖的可选模块是否已安装。"""
+    module = EXPORT_FORMATS[fmt][2]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def to_csv(rows, cols):
+    """逐批把记录写成 CSV 字节流，不构造 DataFrame。"""
+    out = io.BytesIO()
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(cols)
+    for chunk in _chunks(rows):
+        writer.writerows([[_cell_value(r.get(c)) for c in cols] for r in chunk])
+    text.detach()
+    return out.getvalue()
+
+
+def _is_missing(x):
+    return x is None or x != x
+
+
+def _cell_value(x):
+    # NaN / None 写成空单元格，与 pandas.to_csv 的输出保持一致
+    return "" if _is_missing(x) else x
+
+
+def to_xlsx(rows, cols, sheet_name="Sheet1"):
+    """使用 openpyxl 的只写模式逐行写出 XLSX。"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(cols)
+    for r in rows:
+        ws.append([None if _is_missing(x) else x for x in (r.get(c) for c in cols)])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def to_parquet(rows, cols, text_cols):
+    """按批写出 Parquet 行组；text_cols 之外的列按 float64 存储。"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.string() if c in text_cols else pa.float64()) for c in cols])
+    out = io.BytesIO()
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in _chunks(rows):
+            columns = [[_parquet_value(r.get(c), c in text_cols) for r in chunk] for c in cols]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+    return out.getvalue()
+
+
+def _parquet_value(x, is_text):
+    if _is_missing(x):
+        return None
+    return str(x) if is_text else float(x)
+
+
+def export(fmt, rows, cols, text_cols=()):
+    """按格式导出，返回字节串。"""
+    if fmt == "CSV":
+        return to_csv(rows, cols)
+    if fmt == "XLSX":
+        return to_xlsx(rows, cols)
+    if fmt == "Parquet":
+        return to_parquet(rows, cols, set(text_cols))
+    raise ValueError(f"不支持的导出格式: {fmt}")
@@ -0,0 +1,205 @@
+import bisect
+import glob
+import json
+import os
+import time
+
+from perf import monitor
+from storage import Storage
+
+
+class SnapshotStorage(Storage):
+    """把重建出的历史状态包装成只读存储，交给 VoteStore 复用排名与统计逻辑。"""
+
+    def __init__(self, projects, votes):
+        self._projects = list(projects)
+        self._votes = list(votes)
+
+    def load_projects(self):
+        return list(self._projects)
+
+    def load_votes(self):
+        return list(self._votes)
+
+    def apply(self, event):
+        raise PermissionError("历史状态为只读，不能修改。")
+
+
+def _key(vote):
+    return vote['Project Name'], vote['Expert']
+
+
+class RevisionHistory:
+    """评分数据的修订历史：增量日志 + 定期快照。
+
+    每次写入追加一行增量 {"seq", "ts", "actor", "op", "put": 新增或改变的评分, "del": 删除的 (项目, 专家),
+    "add_projects": 新项目, "del_projects": 删除的项目}，只记录真正变化的行；
+    每 snapshot_every 条增量写一个完整快照。重建任一时刻的状态只需从该时刻之前最近的快照
+    重放不超过 snapshot_every 条增量。内存中只保存每条增量的 (序号, 时间, 文件偏移) 索引，
+    其他进程追加的增量在下次读取时增量扫描补齐。
+    """
+
+    DELTAS_FILE = "deltas.jsonl"
+
+    def __init__(self, directory, snapshot_every=200):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.deltas_path = os.path.join(directory, self.DELTAS_FILE)
+        self._seqs, self._times, self._offsets = [], [], []  # 增量索引
+        self._scanned = 0         # 增量文件已扫描到的字节位置
+        self._snapshot_cache = {}  # 路径 -> (项目, 评分)，只保留最近读过的一个
+
+    # --- 索引 ---
+    def _refresh(self):
+        """把其他进程（或本进程）新追加的增量补进索引。"""
+        if not os.path.exists(self.deltas_path) or os.path.getsize(self.deltas_path) == self._scanned:
+            return
+        with open(self.deltas_path, 'rb') as f:
+            f.seek(self._scanned)
+            offset = self._scanned
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 写到一半的末行，下次再读
+                delta = json.loads(line)
+                self._seqs.append(delta['seq'])
+                self._times.append(delta['ts'])
+                self._offsets.append(offset)
+                offset += len(line)
+            self._scanned = offset
+
+    def _snapshots(self):
+        """[(序号, 时间, 路径)]，按序号升序；序号与时间编码在文件名中，无需打开文件。"""
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "snapshot-*.json")):
+            _, seq, ms = os.path.basename(path)[:-len(".json")].split("-")
+            snapshots.append((int(seq), int(ms) / 1000, path))
+        return sorted(snapshots)
+
+    def _write_snapshot(self, seq, ts, projects, votes):
+        path = os.path.join(self.directory, f"snapshot-{seq:08d}-{int(ts * 1000)}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"projects": projects, "votes": votes}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def _load_snapshot(self, path):
+        if path not in self._snapshot_cache:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._snapshot_cache = {path: (data['projects'], data['votes'])}
+        return self._snapshot_cache[path]
+
+    # --- 写入（调用方需持有跨进程写锁） ---
+    def ensure_base(self, state):
+        """首次启用时以当前数据写入序号 0 的基准快照；state 为返回 (项目列表, 评分列表) 的函数。"""
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._snapshots():
+            self._write_snapshot(0, time.time(), *state())
+
+    def record(self, event, removed, added, state):
+        """记录一次写入的增量；removed / added 为 VoteStore 应用该事件时移除与新增的评分。"""
+        self._refresh()
+        seq = (self._seqs[-1] if self._seqs else 0) + 1
+        ts = time.time()
+        before = {_key(v): v for v in removed}
+        added_keys = {_key(v) for v in added}
+        delta = {"seq": seq, "ts": ts, "op": event['op'],
+                 "actor": event.get('expert', "管理员")}
+        put = [v for v in added if before.get(_key(v)) != v]
+        dels = [list(k) for k in before if k not in added_keys]
+        if put:
+            delta['put'] = put
+        if dels:
+            delta['del'] = dels
+        if event['op'] == "add_projects":
+            delta['add_projects'] = event['projects']
+        elif event['op'] == "delete_project":
+            delta['del_projects'] = [event['project']]
+        data = (json.dumps(delta, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        with open(self.deltas_path, 'ab') as f:
+            f.write(data)
+        monitor.count("bytes_written", len(data))
+        self._refresh()
+        if seq % self.snapshot_every == 0:
+            self._write_snapshot(seq, ts, *state())
+
+    # --- 查询 ---
+    def span(self):
+        """历史覆盖的时间范围 (起点, 终点)，尚无历史时返回 None。"""
+        self._refresh()
+        snapshots = self._snapshots()
+        if not snapshots:
+            return None
+        return snapshots[0][1], (self._times[-1] if self._times else snapshots[0][1])
+
+    def _replay(self, start_seq, until_ts, projects, votes, on_delta=None):
+        """从 start_seq 之后的增量开始重放，直到时间超过 until_ts；原地修改 projects / votes。"""
+        i = bisect.bisect_right(self._seqs, start_seq)
+        if i >= len(self._seqs) or self._times[i] > until_ts:
+            return
+        with open(self.deltas_path, 'rb') as f:
+            f.seek(self._offsets[i])
+            for line in f:
+                if i >= len(self._seqs) or self._times[i] > until_ts:
+                    break
+                delta = json.loads(line)
+                if on_delta is not None:
+                    on_delta(delta, projects, votes)
+                for p in delta.get('add_projects', ()):
+                    projects[p['name']] = p
+                for name in delta.get('del_projects', ()):
+                    projects.pop(name, None)
+                for k in delta.get('del', ()):
+                    votes.pop(tuple(k), None)
+                for v in delta.get('put', ()):
+                    votes[_key(v)] = v
+                i += 1
+
+    def state_at(self, ts):
+        """重建 ts 时刻的 ({项目名称: 项目}, {(项目, 专家): 评分})；早于历史起点时返回 None。"""
+        with monitor.phase("history_replay"):
+            self._refresh()
+            snapshots = [s for s in self._snapshots() if s[1] <= ts]
+            if not snapshots:
+                return None
+            seq, _, path = snapshots[-1]
+            snap_projects, snap_votes = self._load_snapshot(path)
+            projects = {p['name']: p for p in snap_projects}
+            votes = {_key(v): v for v in snap_votes}
+            self._replay(seq, ts, projects, votes)
+            return projects, votes
+
+    def changes_between(self, t1, t2):
+        """t1 到 t2 之间“谁改了什么”的明细（按时间顺序），每项含新旧总分；t1 早于历史起点时从起点开始。"""
+        span = self.span()
+        if span is None:
+            return []
+        t1 = max(t1, span[0])
+        state = self.state_at(t1)
+        if state is None:
+            return []
+        projects, votes = state
+        changes = []
+
+        def collect(delta, projects, votes):
+            if delta['ts'] <= t1:
+                return
+            when, actor = delta['ts'], delta['actor']
+            for project in delta.get('add_projects', ()):
+                changes.append((when, actor, project['name'], "", "新增项目", None, None))
+            for name in delta.get('del_projects', ()):
+                changes.append((when, actor, name, "", "删除项目", None, None))
+            for project, expert in delta.get('del', ()):
+                old = votes.get((project, expert), {})
+                changes.append((when, actor, project, expert, "删除评分", old.get('Total'), None))
+            for v in delta.get('put', ()):
+                old = votes.get(_key(v))
+                kind = "新增评分" if old is None else "修改评分"
+                changes.append((when, actor, v['Project Name'], v['Expert'], kind,
+                                None if old is None else old.get('Total'), v.get('Total')))
+
+        seq = bisect.bisect_right(self._times, t1)
+        start_seq = self._seqs[seq - 1] if seq else 0
+        # state_at 已把 t1 之前的增量应用完，这里只重放 (t1, t2] 区间
+        self._replay(start_seq, t2, projects, votes, collect)
+        return changes
@@ -0,0 +1,49 @@
+def read_project_file(uploaded_file):
+    """读取上传的 CSV/XLSX 项目清单，所有列按字符串读入，交给 validate_project_import 统一校验。"""
+    import pandas as pd
+    if uploaded_file.name.lower().endswith(".xlsx"):
+        return pd.read_excel(uploaded_file, dtype=str)  # 需要 openpyxl
+    return pd.read_csv(uploaded_file, dtype=str, encoding='utf-8-sig')
+
+
+def validate_project_import(df, existing_names, stages, columns):
+    """一次性向量化校验导入的项目清单。
+
+    stages 为允许的评审阶段，columns 为必需的列（name、applicant、stage、time）。
+    返回 (有效项目列表, 错误明细 DataFrame)。错误按行汇总，行号与文件中的行号一致（表头为第 1 行）。
+    """
+    import numpy as np
+    import pandas as pd
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必需的列：{', '.join(missing)}（需要 {', '.join(columns)}）")
+
+    names = df['name'].fillna("").str.strip()
+    stage_values = df['stage'].fillna("").str.strip()
+    times = pd.to_numeric(df['time'], errors='coerce')
+
+    checks = [
+        (names == "", "项目名称为空"),
+        ((names != "") & names.duplicated(keep=False), "文件内项目名称重复"),
+        (names.isin(existing_names), "项目名称已存在"),
+        (~stage_values.isin(list(stages)), f"评审阶段必须是 {'/'.join(stages)} 之一"),
+        (times.isna(), "时长必须是数字"),
+        (times.notna() & ((times < 0) | ~np.isfinite(times)), "时长必须是非负的有限数字"),
+    ]
+    messages = pd.Series("", index=df.index)
+    for mask, message in checks:
+        messages = messages.where(~mask, messages + "；" + message)
+    invalid = messages != ""
+
+    errors_df = pd.DataFrame({
+        "行号": df.index[invalid] + 2,
+        "项目名称": names[invalid],
+        "错误": messages[invalid].str.lstrip("；"),
+    })
+    valid = ~invalid
+    valid_times = times[valid]
+    valid_projects = [
+        {"name": n, "applicant": a, "stage": s, "time": int(t) if float(t).is_integer() else float(t)}
+        for n, a, s, t in zip(names[valid], df['applicant'][valid].fillna("").str.strip(), stage_values[valid], valid_times)
+    ]
+    return valid_projects, errors_df
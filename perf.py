@@ -0,0 +1,201 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from types import FunctionType, MethodType, ModuleType
+
+
+def process_path(path, pid=None):
+    """在文件名中加入进程号：metrics.prom -> metrics-1234.prom。同一目录下的多个服务进程各写各的文件。"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{os.getpid() if pid is None else pid}{ext}"
+
+
+def _percentile(ordered, q):
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class PerfMonitor:
+    """进程级性能计时与计数。
+
+    phase() 记录一次阶段耗时到环形缓冲区（只保留最近 capacity 条），
+    count() 累加读写行数、写盘字节等计数器。单次记录只是两次 perf_counter 与一次 deque 追加，
+    可以在生产环境常开。start_export() 启动后台线程定期写出 Prometheus 文本与 JSON 文件；
+    多进程部署时每个进程写自己的文件（文件名含进程号），指标带 process 标签，采集端可直接合并。
+    """
+
+    def __init__(self, capacity=5000):
+        self._samples = deque(maxlen=capacity)  # (阶段, 秒)
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._exporter = None
+        self.export_paths = None  # 本进程实际写出的 (Prometheus 文件, JSON 文件)
+        self.export_error = None  # 最近一次写出失败的原因，成功后清空
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._samples.append((name, time.perf_counter() - start))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def stats(self):
+        """按阶段汇总环形缓冲区中的样本：次数、p50/p95/p99/最大值（毫秒）。"""
+        by_phase = defaultdict(list)
+        for name, seconds in list(self._samples):
+            by_phase[name].append(seconds * 1000)
+        rows = []
+        for name, values in sorted(by_phase.items()):
+            values.sort()
+            rows.append({
+                "phase": name,
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 0.50), 3),
+                "p95_ms": round(_percentile(values, 0.95), 3),
+                "p99_ms": round(_percentile(values, 0.99), 3),
+                "max_ms": round(values[-1], 3),
+            })
+        return rows
+
+    def to_prometheus(self):
+        process = f'process="{os.getpid()}"'
+        lines = ["# TYPE ess_phase_milliseconds summary"]
+        for row in self.stats():
+            label = f'{process},phase="{row["phase"]}"'
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'ess_phase_milliseconds{{{label},quantile="{q}"}} {row[key]}')
+            lines.append(f"ess_phase_milliseconds_count{{{label}}} {row['count']}")
+        for name, value in sorted(self.counters().items()):
+            lines.append(f"# TYPE ess_{name}_total counter")
+            lines.append(f"ess_{name}_total{{{process}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prom_path, json_path):
+        """写出一次指标文件（先写临时文件再替换）。"""
+        payload = {"time": time.time(), "pid": os.getpid(), "phases": self.stats(), "counters": self.counters()}
+        for path, content in ((prom_path, self.to_prometheus()),
+                              (json_path, json.dumps(payload, ensure_ascii=False, indent=2))):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def start_export(self, prom_path, json_path, interval=30.0):
+        """启动后台线程，每 interval 秒写出一次指标文件（重复调用无副作用）。
+
+        实际文件名带上本进程号（见 process_path），进程正常退出时删除自己的文件，
+        避免已退出进程的指标一直留在采集目录里。写出失败时计入 metrics_export_errors 并记下原因。
+        """
+        if self._exporter is not None:
+            return
+        prom_path, json_path = process_path(prom_path), process_path(json_path)
+        self.export_paths = (prom_path, json_path)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export(prom_path, json_path)
+                except OSError as e:
+                    self.count("metrics_export_errors")
+                    self.export_error = f"{type(e).__name__}: {e}"
+                else:
+                    self.export_error = None
+
+        def remove_files():
+            for path in self.export_paths:
+                for stale in (path, f"{path}.tmp"):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+
+        atexit.register(remove_files)
+        self._exporter = threading.Thread(target=run, name="metrics-export", daemon=True)
+        self._exporter.start()
+
+
+def deep_sizeof(obj):
+    """obj 及其引用的容器、记录与字符串的总字节数（sys.getsizeof 递归求和，同一对象只计一次）。
+
+    不进入类、模块与函数；驻留的字符串虽与其他会话共享，也按被引用计入。
+    """
+    seen, stack, total = set(), [obj], 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, int, float, bool, type(None), type, ModuleType, FunctionType, MethodType)):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        else:
+            for cls in type(o).__mro__:
+                slots = cls.__dict__.get('__slots__', ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    if slot not in ('__dict__', '__weakref__') and hasattr(o, slot):
+                        stack.append(getattr(o, slot))
+            if hasattr(o, '__dict__'):
+                stack.append(o.__dict__)
+    return total
+
+
+class SessionStateMeter:
+    """各会话上报的 session state 字节数，用于估算每位在线用户的内存占用。
+
+    每个会话在重跑开始时上报一次（此时的状态即上一次交互留下的状态），
+    超过 stale_after 秒未上报的会话视为已断开，不再计入。
+    """
+
+    def __init__(self, stale_after=600.0):
+        self.stale_after = stale_after
+        self._sessions = {}  # 会话 ID -> (用户, 角色, 字节数, 最大的键, 上报时间)
+        self._lock = threading.Lock()
+
+    def record(self, session_id, user, role, state):
+        """测量 state（{键: 值}）并登记；返回总字节数。"""
+        sizes = {key: deep_sizeof(value) for key, value in state.items()}
+        total = sum(sizes.values())
+        largest = max(sizes, key=sizes.get, default="")
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (user, role, total, largest, now)
+            for sid in [sid for sid, s in self._sessions.items() if now - s[4] > self.stale_after]:
+                del self._sessions[sid]
+        return total
+
+    def rows(self):
+        """在线会话的测量结果，按字节数降序。"""
+        now = time.time()
+        with self._lock:
+            sessions = [s for s in self._sessions.values() if now - s[4] <= self.stale_after]
+        return [
+            {"user": user or "（未登录）", "role": role or "-", "bytes": nbytes, "largest_key": largest,
+             "age_s": round(now - at, 1)}
+            for user, role, nbytes, largest, at in sorted(sessions, key=lambda s: s[2], reverse=True)
+        ]
+
+
+# 进程内唯一的监控实例，各模块直接导入使用
+monitor = PerfMonitor()
@@ -0,0 +1,76 @@
+import sys
+from collections.abc import Mapping
+
+# 在大量记录中重复出现的名称列，转为紧凑记录时驻留（sys.intern），同名字符串全进程只存一份
+NAME_COLS = frozenset(['Project Name', 'Stage', 'Expert'])
+
+_MISSING = object()  # 记录中没有该列（区别于值为 None）
+_row_types = {}      # 列名元组 -> VoteRow 子类
+
+
+class VoteRow(Mapping):
+    """紧凑的评分记录：只读映射，值按列顺序存放在一个元组里。
+
+    列名与列序号由同一组列共享的子类保存（见 row_type），每条记录只有一个槽位，
+    不再像 dict 那样每条重复保存 'Project Name'、'Deliverables' 等键和哈希表。
+    支持 row['Total']、row.get()、dict(row) 以及与 dict 比较相等；
+    需要写入 JSON 或交给存储后端时用 dict(row) 转回普通字典。
+    """
+
+    __slots__ = ('_values',)
+    _cols = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        try:
+            value = self._values[self._index[key]]
+        except KeyError:
+            raise KeyError(key) from None
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (col for col, value in zip(self._cols, self._values) if value is not _MISSING)
+
+    def __len__(self):
+        return sum(1 for value in self._values if value is not _MISSING)
+
+    def __repr__(self):
+        return f"VoteRow({dict(self)!r})"
+
+    def __reduce__(self):
+        return compact_vote, (dict(self), self._cols)
+
+
+def row_type(cols):
+    """返回列为 cols 的 VoteRow 子类（同一组列只创建一次）。"""
+    cols = tuple(cols)
+    cls = _row_types.get(cols)
+    if cls is None:
+        cls = _row_types[cols] = type("VoteRow", (VoteRow,), {
+            '__slots__': (), '_cols': cols, '_index': {col: i for i, col in enumerate(cols)},
+        })
+    return cls
+
+
+def intern_name(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def compact_vote(vote, cols):
+    """把评分字典转为列为 cols 的 VoteRow，名称列驻留；vote 中不在 cols 里的列被丢弃。"""
+    if isinstance(vote, VoteRow) and vote._cols == tuple(cols):
+        return vote
+    return row_type(cols)(tuple(
+        intern_name(vote.get(col, _MISSING)) if col in NAME_COLS else vote.get(col, _MISSING)
+        for col in cols
+    ))
+
+
+def compact_votes(votes, cols):
+    """把 {项目名称: 评分字典} 转为 {项目名称: VoteRow}，项目名称同样驻留。"""
+    return {intern_name(name): compact_vote(v, cols) for name, v in votes.items()}
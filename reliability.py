@@ -0,0 +1,68 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from perf import monitor
+
+
+class ReliabilityJobs:
+    """评审一致性分析的后台计算，结果按数据版本缓存。
+
+    refresh() 发现共享存储的版本号与最新结果不同时，把一次计算提交给单线程的线程池后立即返回；
+    计算在线程中先取分数矩阵快照（只在复制时短暂持有存储的锁），再在锁外完成。
+    同一时刻最多只有一个计算任务，且两次计算的开始至少间隔 debounce 秒：评审高峰期连续的提交
+    合并为一次重算，期间的新写入在间隔过后的下一次 refresh() 时再算。
+    计算以 numpy 矩阵运算为主（500 个项目 × 300 位专家约 0.2 秒），放在线程中即可；
+    页面只读取已完成的最新结果，永远不等待计算。
+    """
+
+    def __init__(self, score_cols, debounce=10.0):
+        self.score_cols = list(score_cols)
+        self.debounce = debounce
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reliability")
+        self._lock = threading.Lock()
+        self._latest = None   # 最近完成的结果（含 version）
+        self._running = None  # 正在计算的 Future
+        self._attempted = None  # 最近一次提交计算时的 (存储, 数据版本)；失败后同一版本不再重试
+        self._error = None    # 最近一次计算失败的异常信息
+        self._started = float('-inf')  # 最近一次提交计算的时间（time.monotonic）
+
+    def refresh(self, store):
+        """数据有变化、没有正在进行的计算且距上次开始已过 debounce 秒时提交新任务。
+
+        返回 (最新结果或 None, 是否有尚未完成的计算：正在计算，或数据已变化、等待下一次计算)。
+        """
+        with self._lock:
+            running = self._running is not None and not self._running.done()
+            # 按存储实例区分版本号：轮次切换或存储重建后版本号会从头计数
+            key = (id(store), store.version)
+            stale = key != self._attempted
+            now = time.monotonic()
+            if stale and not running and now - self._started >= self.debounce:
+                self._attempted, self._started = key, now
+                self._running = self._executor.submit(self._compute, store)
+                running, stale = True, False
+            return self._latest, running or stale
+
+    def error(self):
+        with self._lock:
+            return self._error
+
+    def _compute(self, store):
+        from analytics import agreement  # numpy 只在后台线程中首次计算时导入
+        start = time.perf_counter()
+        try:
+            with monitor.phase("reliability"):
+                version, experts, data = store.score_snapshot()
+                result = agreement(data, experts, self.score_cols)
+        except Exception as e:  # 后台线程中的异常不会自动显示，记录下来交给页面展示
+            with self._lock:
+                self._error = f"{type(e).__name__}: {e}"
+            raise
+        result.update(version=version, computed_at=time.time(), seconds=time.perf_counter() - start)
+        with self._lock:
+            self._latest, self._error = result, None
+        return result
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from storage import Storage
+
+
+class ReadOnlyStorage(Storage):
+    """只读包装：用于打开已归档轮次，任何写操作都会被拒绝。"""
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def load_projects(self):
+        return self._storage.load_projects()
+
+    def load_votes(self):
+        return self._storage.load_votes()
+
+    def apply(self, event):
+        raise PermissionError("已归档的评审轮次为只读，不能修改。")
+
+    def close(self):
+        self._storage.close()
+
+
+class RoundManager:
+    """评审轮次清单。
+
+    每个轮次的项目、评分、暂存等数据都放在各自的分区目录中；
+    清单文件记录当前进行中的轮次和已归档轮次，启动时只加载进行中轮次的分区。
+    升级前的数据（根目录下的 projects.csv / final_votes.csv）作为“默认轮次”，分区目录为 "."。
+    轮次结束时把排名汇总预先计算并写入该分区的 summary.json，浏览归档轮次时无需加载评分。
+    """
+
+    SUMMARY_FILE = "summary.json"
+
+    def __init__(self, rounds_dir, manifest_name="rounds.json"):
+        self.rounds_dir = rounds_dir
+        self.manifest_path = os.path.join(rounds_dir, manifest_name)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._manifest = None
+
+    def _load(self):
+        """按文件修改时间缓存清单，其他进程切换轮次后也能及时看到。"""
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except FileNotFoundError:
+            mtime = None
+        if self._manifest is None or mtime != self._mtime:
+            if mtime is None:
+                self._manifest = {
+                    "active": "default",
+                    "rounds": [{"id": "default", "name": "默认轮次", "dir": ".", "status": "active",
+                                "created": None, "closed": None}],
+                }
+            else:
+                with open(self.manifest_path, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            self._mtime = mtime
+        return self._manifest
+
+    def _save(self, manifest):
+        os.makedirs(self.rounds_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest = manifest
+        self._mtime = os.path.getmtime(self.manifest_path)
+
+    def rounds(self):
+        with self._lock:
+            return [dict(r) for r in self._load()['rounds']]
+
+    def active(self):
+        """当前进行中的轮次记录。"""
+        with self._lock:
+            manifest = self._load()
+            return dict(next(r for r in manifest['rounds'] if r['id'] == manifest['active']))
+
+    def archived(self):
+        """已归档的轮次，最近关闭的在前。"""
+        return sorted((r for r in self.rounds() if r['status'] == "closed"),
+                      key=lambda r: r['closed'] or "", reverse=True)
+
+    def get(self, round_id):
+        return next((r for r in self.rounds() if r['id'] == round_id), None)
+
+    def start_new_round(self, name, summary_rows, project_count, vote_count):
+        """归档当前轮次（写入预先计算的汇总）并创建新的空分区作为进行中轮次，返回新轮次记录。"""
+        with self._lock:
+            manifest = json.loads(json.dumps(self._load()))
+            now = datetime.now().strftime("%Y-%m-%d %H:%M")
+            current = next(r for r in manifest['rounds'] if r['id'] == manifest['active'])
+
+            summary = {"closed": now, "projects": project_count, "votes": vote_count, "rows": summary_rows}
+            summary_path = os.path.join(current['dir'], self.SUMMARY_FILE)
+            with open(f"{summary_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, default=str)
+            os.replace(f"{summary_path}.tmp", summary_path)
+            current.update(status="closed", closed=now)
+
+            round_id = base_id = datetime.now().strftime("%Y%m%d%H%M%S")
+            existing = {r['id'] for r in manifest['rounds']}
+            while round_id in existing:
+                round_id = f"{base_id}-{len(existing)}"
+                existing.add(round_id)
+            new_round = {"id": round_id, "name": name, "dir": os.path.join(self.rounds_dir, round_id),
+                         "status": "active", "created": now, "closed": None}
+            os.makedirs(new_round['dir'], exist_ok=True)
+            manifest['rounds'].append(new_round)
+            manifest['active'] = round_id
+            self._save(manifest)
+            return dict(new_round)
+
+    def load_summary(self, round_record):
+        """读取归档轮次结束时预先计算的汇总。"""
+        path = os.path.join(round_record['dir'], self.SUMMARY_FILE)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+@dataclass(frozen=True)
+class Criterion:
+    """单个评分项：列名 key、名称、说明、满分、权重与分档（(名称, 下限, 上限) 元组）。"""
+
+    key: str
+    name: str
+    desc: str
+    max: int
+    weight: float
+    bands: tuple
+
+    @property
+    def title(self):
+        return f"{self.name} ({self.max}分)"
+
+    @property
+    def tips(self):
+        """分档提示，如 “符合要求16~20分；基本符合12~15分；不符合＜12分。”"""
+        parts = [
+            f"{label}＜{hi + 1}分" if lo == 0 and i == len(self.bands) - 1 and i > 0 else f"{label}{lo}\\~{hi}分"
+            for i, (label, lo, hi) in enumerate(self.bands)
+        ]
+        return "；".join(parts) + "。" if parts else ""
+
+
+@dataclass(frozen=True)
+class Rubric:
+    """某一评审阶段编译好的评分标准，负责分数校验与加权总分。"""
+
+    stage: str
+    criteria: tuple
+
+    @property
+    def keys(self):
+        return tuple(c.key for c in self.criteria)
+
+    def validate(self, inputs):
+        """校验 {列名: 输入文本}，返回 (有效分数, {列名: 错误信息})；空输入与无效输入按 0 分计。"""
+        scores, errors = {}, {}
+        for c in self.criteria:
+            text = inputs.get(c.key, "")
+            try:
+                score = int(text)
+            except ValueError:
+                scores[c.key] = 0
+                if text.strip():
+                    errors[c.key] = f"❌ {c.title}：输入值 '{text}' 必须是整数。"
+                continue
+            if 0 <= score <= c.max:
+                scores[c.key] = score
+            else:
+                scores[c.key] = 0
+                errors[c.key] = f"❌ {c.title}：分数必须是 0 到 {c.max} 之间的整数。您输入了 {text}。"
+        return scores, errors
+
+    @property
+    def max_total(self):
+        return self.total({c.key: c.max for c in self.criteria})
+
+    def total(self, scores):
+        """按权重求总分，结果为整数时返回 int。"""
+        total = sum(scores.get(c.key, 0) * c.weight for c in self.criteria)
+        return int(total) if float(total).is_integer() else round(total, 2)
+
+
+@dataclass(frozen=True)
+class RubricSet:
+    """配置文件中全部阶段的评分标准；score_cols 为各阶段评分项列名的并集（按首次出现顺序），即评分记录的分数列。"""
+
+    rubrics: MappingProxyType
+    score_cols: tuple
+
+    @property
+    def stages(self):
+        return tuple(self.rubrics)
+
+    def __getitem__(self, stage):
+        return self.rubrics[stage]
+
+    def __contains__(self, stage):
+        return stage in self.rubrics
+
+
+def compile_rubrics(config):
+    """把配置字典编译为不可变的 RubricSet，配置有误时抛出 ValueError。"""
+    stages = config.get("stages")
+    if not isinstance(stages, dict) or not stages:
+        raise ValueError("评分标准配置缺少 stages。")
+    rubrics, score_cols = {}, []
+    for stage, items in stages.items():
+        criteria = []
+        for item in items:
+            try:
+                bands = tuple((str(label), int(lo), int(hi)) for label, lo, hi in item.get("bands", ()))
+                criterion = Criterion(
+                    key=str(item["key"]), name=str(item["name"]), desc=str(item.get("desc", "")),
+                    max=int(item["max"]), weight=float(item.get("weight", 1)), bands=bands,
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"阶段“{stage}”的评分项配置有误：{item}（{e}）") from e
+            if criterion.key in ('Project Name', 'Stage', 'Expert', 'Total', 'Time'):
+                raise ValueError(f"评分项列名不能使用保留列名：{criterion.key}")
+            criteria.append(criterion)
+            if criterion.key not in score_cols:
+                score_cols.append(criterion.key)
+        if not criteria:
+            raise ValueError(f"阶段“{stage}”没有评分项。")
+        rubrics[stage] = Rubric(stage=stage, criteria=tuple(criteria))
+    return RubricSet(rubrics=MappingProxyType(rubrics), score_cols=tuple(score_cols))
+
+
+_cache = {}  # 路径 -> (修改时间, RubricSet)
+_cache_lock = threading.Lock()
+
+
+def load_rubrics(path):
+    """读取并编译评分标准配置，按文件修改时间缓存：文件未变时只需一次 os.stat。"""
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, encoding='utf-8') as f:
+            rubric_set = compile_rubrics(json.load(f))
+        _cache[path] = (mtime, rubric_set)
+        return rubric_set
@@ -0,0 +1,29 @@
+# 评分记录上的纯 Python 计算（不依赖 numpy）：共享存储的滚动统计与专家评分页只用到这些，
+# 冷启动时不必导入 numpy；向量化的排名统计与一致性分析见 analytics.py。
+
+
+def score_value(vote, col):
+    """取出数值分数，缺失值（None / NaN / 空字符串）返回 None。"""
+    x = vote.get(col)
+    if x is None or x == "" or x != x:
+        return None
+    return float(x)
+
+
+def vote_total(vote, score_cols):
+    """评分记录的总分：优先取记录中（按评分标准权重）算好的 Total，缺失时按各评分项求和。"""
+    total = score_value(vote, 'Total')
+    if total is not None:
+        return total
+    return sum(x for x in (score_value(vote, col) for col in score_cols) if x is not None)
+
+
+def robust_summary(values):
+    """单个项目总分列表的 (去极值均分, 中位数)，口径与 analytics.ScoreMatrix.statistics 一致；空列表返回 (None, None)。"""
+    n = len(values)
+    if not n:
+        return None, None
+    ordered = sorted(values)
+    trimmed = sum(ordered[1:-1]) / (n - 2) if n >= 3 else sum(ordered) / n
+    median = (ordered[(n - 1) // 2] + ordered[n // 2]) / 2
+    return trimmed, median
@@ -0,0 +1,386 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import streamlit as st
+
+from perf import monitor
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为进程内串行写入
+    fcntl = None
+
+# 按文本读取的列（读入时驻留，同名字符串只存一份）；其余列读入时转换为 int / float（无法转换的保留原文本）
+TEXT_COLS = frozenset(['name', 'applicant', 'stage', 'Project Name', 'Stage', 'Expert', 'Time'])
+
+
+def _parse(value):
+    """CSV 单元格转数值：空字符串为 None，整数优先，其次浮点数，否则保留文本。"""
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _format(value):
+    """写出 CSV 单元格：None / NaN 写为空，整数值的浮点数去掉多余的 .0。"""
+    if value is None or value != value:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value
+
+
+# --- 数据持久化函数 ---
+def load_data(file_path, default_cols, text_cols=TEXT_COLS):
+    """用 csv 模块读取 CSV 为记录列表（不依赖 pandas），文件不存在或为空时返回空列表。"""
+    if not os.path.exists(file_path):
+        return []
+    try:
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return []
+            parsers = [(col, sys.intern if col in text_cols else _parse) for col in header]
+            records = []
+            for row in reader:
+                if not row:
+                    continue
+                record = dict.fromkeys(default_cols)
+                for (col, parse), value in zip(parsers, row):
+                    record[col] = None if value == "" else parse(value)
+                records.append(record)
+        monitor.count("rows_read", len(records))
+        return records
+    except Exception as e:
+        st.error(f"加载数据文件 {file_path} 失败: {e}")
+        return []
+
+def save_data(records, file_path, cols):
+    """按 cols 的列顺序把记录列表写为 CSV（先写临时文件再替换，避免写到一半的文件被读到）。"""
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(cols)
+        writer.writerows([_format(r.get(col)) for col in cols] for r in records)
+    monitor.count("rows_written", len(records))
+    monitor.count("bytes_written", os.path.getsize(tmp_path))
+    os.replace(tmp_path, file_path)
+
+
+def apply_vote_event(by_project, event):
+    """把一条评分事件应用到 {项目名称: {专家: 评分记录}} 索引上，返回 (被移除的记录, 新增的记录)。
+
+    内存存储与 CSV 后端重放日志共用这一份逻辑；项目类事件由调用方自行处理。
+    """
+    op = event['op']
+    removed, added = [], []
+    if op in ("clear_project", "delete_project"):
+        removed.extend(by_project.pop(event['project'], {}).values())
+    elif op == "replace_expert":
+        expert = event['expert']
+        for name in list(by_project):
+            by_expert = by_project[name]
+            if expert in by_expert:
+                removed.append(by_expert.pop(expert))
+                if not by_expert:
+                    del by_project[name]
+        for v in event['rows']:
+            by_project.setdefault(v['Project Name'], {})[expert] = v
+            added.append(v)
+    elif op != "add_projects":
+        raise ValueError(f"未知的评分日志事件: {op}")
+    return removed, added
+
+
+# --- 最终评分的追加日志 ---
+class VoteJournal:
+    """最终评分的只追加日志。
+
+    每次写操作只追加一行 JSON 事件（O(本次提交行数)），
+    final_votes.csv 作为快照，启动时“快照 + 重放日志”重建，
+    事件数超过 compact_every 时把当前评分压缩回快照并清空日志。
+    事件均为幂等操作，压缩中途崩溃时重复重放也不会出错。
+    """
+
+    def __init__(self, snapshot_path, journal_path, vote_cols, compact_every=500):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.vote_cols = vote_cols
+        self.compact_every = compact_every
+        self.pending = 0  # 自上次压缩以来的事件数
+
+    def load_snapshot(self):
+        return load_data(self.snapshot_path, self.vote_cols)
+
+    def events(self):
+        """按顺序读出日志中的全部事件，忽略崩溃时写了一半的末行。"""
+        if not os.path.exists(self.journal_path):
+            return []
+        events = []
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        self.pending = len(events)
+        return events
+
+    def append(self, event):
+        """追加一条事件并落盘。"""
+        data = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        with open(self.journal_path, 'ab') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending += 1
+        monitor.count("rows_written", len(event.get('rows', ())) or 1)
+        monitor.count("bytes_written", len(data))
+
+    def should_compact(self):
+        return self.pending >= self.compact_every
+
+    def compact(self, votes):
+        """把当前全部评分写成快照，然后清空日志。"""
+        save_data(votes, self.snapshot_path, self.vote_cols)
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self.pending = 0
+
+
+# --- 存储后端 ---
+class Storage:
+    """存储后端接口。
+
+    写操作统一以事件形式提交（与 VoteJournal 的事件格式相同）：
+    add_projects / delete_project / clear_project / replace_expert。
+    """
+
+    def load_projects(self):
+        raise NotImplementedError
+
+    def load_votes(self):
+        raise NotImplementedError
+
+    def apply(self, event):
+        """持久化一条写事件。"""
+        raise NotImplementedError
+
+    def checkpoint(self, current_votes):
+        """写入之后的维护钩子，current_votes 为返回当前全部评分的函数。"""
+
+    def observe(self, event):
+        """其他进程已持久化了一条事件，同步本后端在进程内缓存的状态。"""
+
+    def close(self):
+        """释放后端持有的连接与文件句柄（轮次结束、存储被替换时调用）。"""
+
+
+class CsvStorage(Storage):
+    """CSV 后端：projects.csv 整体重写（项目数量少），最终评分走追加日志。
+
+    read_only=True 时加载后不做日志压缩，用于打开已归档的轮次。
+    """
+
+    def __init__(self, projects_path, project_cols, journal, read_only=False):
+        self.projects_path = projects_path
+        self.project_cols = project_cols
+        self.journal = journal
+        self.read_only = read_only
+        self._projects = []
+
+    def load_projects(self):
+        self._projects = load_data(self.projects_path, self.project_cols)
+        return list(self._projects)
+
+    def load_votes(self):
+        by_project = {}
+        for v in self.journal.load_snapshot():
+            by_project.setdefault(v['Project Name'], {})[v['Expert']] = v
+        for event in self.journal.events():
+            apply_vote_event(by_project, event)
+        votes = [v for by_expert in by_project.values() for v in by_expert.values()]
+        if self.journal.pending and not self.read_only:
+            self.journal.compact(votes)
+        return votes
+
+    def apply(self, event):
+        op = event['op']
+        if op == "add_projects":
+            self._projects.extend(event['projects'])
+            self._save_projects()
+        elif op == "delete_project":
+            self._projects = [p for p in self._projects if p['name'] != event['project']]
+            self._save_projects()
+            self.journal.append({"op": "clear_project", "project": event['project']})
+        else:
+            self.journal.append(event)
+
+    def checkpoint(self, current_votes):
+        if self.journal.should_compact():
+            self.journal.compact(current_votes())
+
+    def observe(self, event):
+        op = event['op']
+        if op == "add_projects":
+            self._projects.extend(event['projects'])
+        elif op == "delete_project":
+            self._projects = [p for p in self._projects if p['name'] != event['project']]
+        if op != "add_projects":
+            self.journal.pending += 1
+
+    def _save_projects(self):
+        save_data(self._projects, self.projects_path, self.project_cols)
+
+
+class SqliteStorage(Storage):
+    """SQLite 后端（WAL 模式），读者不会被写者阻塞。
+
+    进程内共用一个连接，由锁串行化（Streamlit 每次重跑都换一个线程，按线程建连接会不断累积）；项目按名称主键，评分按 (项目, 专家) 主键（兼作项目索引），另建专家索引，
+    清空/删除均为带索引的 DELETE，最终提交在单个事务内替换某专家的全部评分。
+    read_only=True 时（已归档轮次）以只读方式打开数据库，不建表、不补列，缺少的列读为 None。
+    """
+
+    MIGRATED = 1  # PRAGMA user_version 的取值：已完成从 CSV 的迁移
+
+    def __init__(self, db_path, project_cols, vote_cols, read_only=False):
+        self.db_path = db_path
+        self.project_cols = project_cols
+        self.vote_cols = vote_cols
+        self.read_only = read_only
+        self._db = None  # 共享连接，首次使用时打开
+        self._lock = threading.RLock()
+        if read_only:
+            return
+        with self.connection() as conn, conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS projects ({self._col_defs(project_cols)}, PRIMARY KEY (name))")
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS votes ({self._col_defs(vote_cols)}, '
+                f'PRIMARY KEY ("Project Name", "Expert"))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_votes_expert ON votes ("Expert")')
+            for table, cols in (("projects", project_cols), ("votes", vote_cols)):
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for col in cols:
+                    if col not in existing:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN "{col}"')
+
+    @staticmethod
+    def _col_defs(cols):
+        return ", ".join(f'"{c}"' for c in cols)
+
+    @contextmanager
+    def connection(self):
+        """持锁期间使用共享连接（允许跨线程，由锁保证同一时刻只有一个线程在用）。"""
+        with self._lock:
+            if self._db is None:
+                if self.read_only:
+                    uri = "file:" + quote(os.path.abspath(self.db_path)) + "?mode=ro"
+                    self._db = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+                else:
+                    self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+                    self._db.execute("PRAGMA journal_mode=WAL")
+                    self._db.execute("PRAGMA synchronous=NORMAL")
+            yield self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _select(self, table, cols):
+        with self.connection() as conn:
+            if self.read_only:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                col_list = ", ".join(f'"{c}"' if c in existing else f'NULL AS "{c}"' for c in cols)
+            else:
+                col_list = self._col_defs(cols)
+            rows = conn.execute(f"SELECT {col_list} FROM {table} ORDER BY rowid").fetchall()
+        monitor.count("rows_read", len(rows))
+        return [dict(zip(cols, row)) for row in rows]
+
+    def load_projects(self):
+        return self._select("projects", self.project_cols)
+
+    def load_votes(self):
+        return self._select("votes", self.vote_cols)
+
+    def migrated(self):
+        """是否已完成从 CSV 的一次性迁移。"""
+        with self.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0] >= self.MIGRATED
+
+    def is_empty(self):
+        with self.connection() as conn:
+            return not (conn.execute("SELECT 1 FROM projects LIMIT 1").fetchone()
+                        or conn.execute("SELECT 1 FROM votes LIMIT 1").fetchone())
+
+    def insert_projects(self, conn, projects):
+        placeholders = ", ".join("?" * len(self.project_cols))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO projects ({self._col_defs(self.project_cols)}) VALUES ({placeholders})",
+            [[p.get(c) for c in self.project_cols] for p in projects],
+        )
+
+    def insert_votes(self, conn, votes):
+        placeholders = ", ".join("?" * len(self.vote_cols))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO votes ({self._col_defs(self.vote_cols)}) VALUES ({placeholders})",
+            [[v.get(c) for c in self.vote_cols] for v in votes],
+        )
+
+    def apply(self, event):
+        op = event['op']
+        with self.connection() as conn:
+            changes_before = conn.total_changes
+            with conn:  # 单个事务，异常时自动回滚
+                if op == "add_projects":
+                    self.insert_projects(conn, event['projects'])
+                elif op == "delete_project":
+                    conn.execute('DELETE FROM votes WHERE "Project Name" = ?', (event['project'],))
+                    conn.execute("DELETE FROM projects WHERE name = ?", (event['project'],))
+                elif op == "clear_project":
+                    conn.execute('DELETE FROM votes WHERE "Project Name" = ?', (event['project'],))
+                elif op == "replace_expert":
+                    conn.execute('DELETE FROM votes WHERE "Expert" = ?', (event['expert'],))
+                    self.insert_votes(conn, event['rows'])
+                else:
+                    raise ValueError(f"未知的存储事件: {op}")
+            monitor.count("rows_written", conn.total_changes - changes_before)
+
+
+def migrate_csv_to_sqlite(csv_storage, sqlite_storage):
+    """一次性把 CSV 后端的项目与评分导入 SQLite，返回导入的 (项目数, 评分数)。
+
+    完成后在数据库中记下迁移标记（PRAGMA user_version），之后即使管理员删光了全部项目也不会再次导入旧 CSV。
+    没有标记但已有数据的数据库（标记引入之前迁移的）直接补记标记。
+    """
+    if sqlite_storage.migrated():
+        return 0, 0
+    projects, votes = [], []
+    if sqlite_storage.is_empty():
+        projects = csv_storage.load_projects()
+        votes = csv_storage.load_votes()
+    with sqlite_storage.connection() as conn, conn:
+        sqlite_storage.insert_projects(conn, projects)
+        sqlite_storage.insert_votes(conn, votes)
+        conn.execute(f"PRAGMA user_version = {SqliteStorage.MIGRATED}")
+    return len(projects), len(votes)
@@ -0,0 +1,525 @@
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from perf import monitor
+from scores import robust_summary, score_value, vote_total
+from storage import apply_vote_event
+
+
+class SubmitConflict(Exception):
+    """最终提交与并发修改真正冲突：提交中含已删除的项目，或沿用的已提交评分已被清空。"""
+
+    def __init__(self, deleted, cleared):
+        self.deleted = list(deleted)
+        self.cleared = list(cleared)
+        parts = []
+        if self.deleted:
+            parts.append("以下项目已被管理员删除：" + "、".join(self.deleted))
+        if self.cleared:
+            parts.append("以下项目的评分已被管理员清空，请重新评分后再提交：" + "、".join(self.cleared))
+        super().__init__("；".join(parts))
+
+
+class ProjectAggregate:
+    """单个项目的滚动统计：各评分项（含 Total）的计数、求和、最小值、最大值。
+
+    增加一条评分为 O(1)；移除时仅当被移除的值恰好是最小/最大值才需要
+    对该项目剩余评分重算极值。Total 取评分记录中按权重算好的总分（见 vote_total）。
+    """
+
+    __slots__ = ('score_cols', 'count', 'n', 'sums', 'mins', 'maxs')
+
+    def __init__(self, score_cols):
+        self.score_cols = score_cols
+        self.count = 0
+        cols = list(score_cols) + ['Total']
+        self.n = dict.fromkeys(cols, 0)
+        self.sums = dict.fromkeys(cols, 0.0)
+        self.mins = dict.fromkeys(cols)
+        self.maxs = dict.fromkeys(cols)
+
+    def _values(self, vote):
+        values = {col: score_value(vote, col) for col in self.score_cols}
+        values['Total'] = vote_total(vote, self.score_cols)
+        return values
+
+    def add(self, vote):
+        self.count += 1
+        for col, x in self._values(vote).items():
+            if x is None:
+                continue
+            self.n[col] += 1
+            self.sums[col] += x
+            if self.mins[col] is None or x < self.mins[col]:
+                self.mins[col] = x
+            if self.maxs[col] is None or x > self.maxs[col]:
+                self.maxs[col] = x
+
+    def remove(self, vote, remaining):
+        """移除一条评分；remaining 为该项目剩余的评分记录，仅在需要重算极值时遍历。"""
+        self.count -= 1
+        for col, x in self._values(vote).items():
+            if x is None:
+                continue
+            self.n[col] -= 1
+            self.sums[col] -= x
+            if x <= self.mins[col] or x >= self.maxs[col]:
+                rest = [y for y in (self._values(v)[col] for v in remaining) if y is not None]
+                self.mins[col] = min(rest, default=None)
+                self.maxs[col] = max(rest, default=None)
+
+    def mean(self, col):
+        return self.sums[col] / self.n[col] if self.n[col] else None
+
+
+class VoteStore:
+    """进程内共享的项目与最终评分存储。
+
+    所有会话共用同一个实例（由 app.py 通过 st.cache_resource 创建），
+    按项目、按 (项目, 专家) 建立索引，写操作原地更新，并维护每个项目的滚动统计
+    以及“专家 -> 已有最终评分的项目集合”的完成度索引。
+    每次写入都以事件形式先交给存储后端持久化，再更新内存索引。
+
+    多进程部署时传入共享的 ChangeLog：写入在跨进程锁内先追上其他进程的变更再持久化，
+    sync() 把其他进程写入的事件增量应用到本进程的索引，只影响事件涉及的项目或专家。
+
+    每次写入还会在变更流（最近 FEED_SIZE 条）中记录新版本号、受影响的项目与新到的评分，
+    供实时看板只刷新变化的项目。传入 RevisionHistory 时每次写入同时记录修订历史。
+    """
+
+    FEED_SIZE = 1000
+
+    def __init__(self, storage, score_cols, changelog=None, history=None):
+        self._lock = threading.RLock()
+        self._storage = storage
+        self._changelog = changelog
+        self.history = history
+        self.score_cols = list(score_cols)
+        self.version = 0       # 每次写入（含其他进程的写入）后递增
+        self.closed = False    # close() 之后拒绝一切写入
+        with self._shared_lock():
+            self._load()
+            if changelog is not None:
+                changelog.skip_to_end()
+            if history is not None:
+                history.ensure_base(self._state)
+
+    def _load(self):
+        """从存储后端全量加载并重建全部索引。"""
+        self._projects = {}    # 项目名称 -> 项目记录
+        self._by_project = {}  # 项目名称 -> {专家: 评分记录}
+        self._aggregates = {}  # 项目名称 -> ProjectAggregate
+        self._completed = {}   # 专家 -> {已有最终评分且仍存在的项目名称}
+        self._summary = None   # (version, 排名汇总行)
+        self._live = None      # (version, {项目名称: 实时统计行}, 排名)，实时看板所有会话共用
+        self._derived = (None, {})  # (version, {名称: 派生结果})，同一版本内复用的小结果
+        self._matrix = None    # 稠密分数矩阵（见 matrix），首次使用时才构建
+        self._feed = deque(maxlen=self.FEED_SIZE)   # (版本号, 受影响的项目, 新到的评分, 时间戳)
+        for p in self._storage.load_projects():
+            self._projects[p['name']] = p
+        for v in self._storage.load_votes():
+            self._by_project.setdefault(v['Project Name'], {})[v['Expert']] = v
+            self._aggregate_for(v['Project Name']).add(v)
+            self._mark_completed(v)
+        self.version += 1
+        self._feed_start = self.version  # 变更流只能回答这个版本之后的变化
+
+    @property
+    def matrix(self):
+        """稠密分数矩阵（analytics.ScoreMatrix），首次用于排名或一致性分析时才按当前评分构建，之后随写入增量修补。
+
+        numpy 只在这里按需导入：专家评分页用不到矩阵，冷启动不必付出导入 numpy 的开销。调用方需持有锁。
+        """
+        if self._matrix is None:
+            from analytics import ScoreMatrix
+            matrix = ScoreMatrix(self.score_cols)
+            for by_expert in self._by_project.values():
+                for v in by_expert.values():
+                    matrix.set_vote(v)
+            self._matrix = matrix
+        return self._matrix
+
+    def _state(self):
+        return self.projects(), self.votes()
+
+    def _shared_lock(self):
+        return self._changelog.locked() if self._changelog is not None else nullcontext()
+
+    def sync(self):
+        """应用其他进程写入的变更，返回应用的事件数（无变更时只有一次 os.stat）。"""
+        if self._changelog is None or self.closed:
+            return 0
+        with self._lock:
+            return self._catch_up(held=False)
+
+    def _catch_up(self, held):
+        """增量应用变更日志中的新事件；held 表示调用方已持有跨进程写锁。"""
+        events, reset = self._changelog.poll()
+        if reset:
+            # 错过了被轮换掉的日志段，只能在写锁内全量重新加载
+            with nullcontext() if held else self._changelog.locked():
+                self._changelog.poll()
+                self._load()
+            monitor.count("store_full_reloads")
+            return len(events)
+        for event in events:
+            self._storage.observe(event)
+            self._apply(event)
+        if events:
+            monitor.count("store_remote_events", len(events))
+        return len(events)
+
+    def close(self):
+        """释放变更日志与存储后端的文件句柄、数据库连接（轮次结束时调用）。
+
+        关闭后仍可读取内存中的数据，但任何写入都会抛出 PermissionError，
+        避免仍持有旧实例的回调把数据写进已归档的轮次。
+        """
+        with self._lock:
+            self.closed = True
+            if self._changelog is not None:
+                self._changelog.close()
+            self._storage.close()
+
+    # --- 读取 ---
+    def projects(self):
+        """返回项目列表（按添加顺序）。"""
+        with self._lock:
+            return list(self._projects.values())
+
+    def get_project(self, name):
+        return self._projects.get(name)
+
+    def has_project(self, name):
+        return name in self._projects
+
+    def votes(self):
+        """返回全部最终评分记录。"""
+        with self._lock:
+            return [v for by_expert in self._by_project.values() for v in by_expert.values()]
+
+    def votes_for_project(self, project_name):
+        with self._lock:
+            return list(self._by_project.get(project_name, {}).values())
+
+    def votes_for_expert(self, expert):
+        """返回 {项目名称: 评分记录}，仅包含该专家的最终评分。"""
+        with self._lock:
+            return {
+                name: by_expert[expert]
+                for name, by_expert in self._by_project.items()
+                if expert in by_expert
+            }
+
+    def get_vote(self, project_name, expert):
+        return self._by_project.get(project_name, {}).get(expert)
+
+    def _cached(self, key, compute):
+        """同一数据版本内复用的派生结果，版本变化后整体失效；调用方需持有锁。"""
+        if self._derived[0] != self.version:
+            self._derived = (self.version, {})
+        cache = self._derived[1]
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def vote_count(self):
+        with self._lock:
+            return self._cached('vote_count', lambda: sum(len(by_expert) for by_expert in self._by_project.values()))
+
+    def experts(self):
+        """已有最终评分的专家（按名称排序），同一版本内复用，不复制各专家的项目集合。"""
+        with self._lock:
+            return self._cached('experts', lambda: tuple(sorted(e for e, done in self._completed.items() if done)))
+
+    def complete_expert_count(self):
+        """已对全部项目有最终评分的专家人数，同一版本内复用。"""
+        with self._lock:
+            return self._cached('complete_experts', lambda: sum(1 for e in self._completed if self.is_complete(e)))
+
+    def is_complete(self, expert):
+        """专家是否已对当前全部项目有最终评分（集合大小比较，O(1)）。"""
+        n = len(self._projects)
+        return n > 0 and len(self._completed.get(expert, ())) == n
+
+    def completed_projects(self, expert):
+        with self._lock:
+            return set(self._completed.get(expert, ()))
+
+    def completion(self):
+        """返回 {专家: 已完成项目集合} 的快照，供进度矩阵使用。"""
+        with self._lock:
+            return {expert: set(done) for expert, done in self._completed.items() if done}
+
+    def aggregate(self, project_name):
+        return self._aggregates.get(project_name)
+
+    def find_projects(self, search="", expert=None, stage=None, total_range=None, sort_by="name", descending=False):
+        """按条件筛选并排序项目名称，只用索引与滚动统计，不展开评分明细。
+
+        expert 取完成度索引中该专家评过的项目；total_range=(lo, hi) 按滚动统计的总分最小/最大值
+        保留与区间有交集的项目；sort_by 为 "name"、"mean"（平均总分）或 "experts"（评分人数）。
+        """
+        with self._lock:
+            if expert:
+                done = self._completed.get(expert, set())
+                names = [name for name in self._projects if name in done]
+            else:
+                names = list(self._projects)
+            if stage:
+                names = [name for name in names if self._projects[name].get('stage') == stage]
+            if search:
+                needle = search.strip().lower()
+                names = [name for name in names if needle in str(name).lower()]
+            if total_range is not None:
+                lo, hi = total_range
+                names = [
+                    name for name in names
+                    if name in self._aggregates and self._aggregates[name].count
+                    and self._aggregates[name].mins['Total'] <= hi and self._aggregates[name].maxs['Total'] >= lo
+                ]
+            if sort_by == "mean":
+                def key(name):
+                    mean = self._aggregates[name].mean('Total') if name in self._aggregates else None
+                    return (mean is not None, mean or 0)
+            elif sort_by == "experts":
+                def key(name):
+                    return self._aggregates[name].count if name in self._aggregates else 0
+            else:
+                key = str
+            return sorted(names, key=key, reverse=descending)
+
+    def score_snapshot(self):
+        """返回 (版本号, 专家列表, 分数矩阵副本)，供后台分析在锁外计算。"""
+        with self._lock:
+            _, experts, data = self.matrix.snapshot()
+            return self.version, experts, data
+
+    def changes_since(self, version):
+        """返回 (当前版本, version 之后受影响的项目集合)；变更流已不够回溯时项目集合为 None，调用方需全量刷新。"""
+        with self._lock:
+            if version < self._feed_start or (self._feed and version < self._feed[0][0] - 1):
+                return self.version, None
+            changed = set()
+            for v, names, _, _ in reversed(self._feed):
+                if v <= version:
+                    break
+                changed.update(names)
+            return self.version, changed
+
+    def recent_votes(self, limit=10):
+        """最近到达的最终评分（新到的在前），每项为 (到达时间戳, 评分记录)。"""
+        with self._lock:
+            recent = []
+            for _, _, added, at in reversed(self._feed):
+                for v in added:
+                    recent.append((at, v))
+                    if len(recent) >= limit:
+                        return recent
+            return recent
+
+    def live_row(self, project_name):
+        """单个项目的实时统计行（仅用该项目的评分计算），项目不存在时返回 None。"""
+        with self._lock:
+            project = self._projects.get(project_name)
+            if project is None:
+                return None
+            votes = self._by_project.get(project_name, {}).values()
+            totals = [vote_total(v, self.score_cols) for v in votes]
+            trimmed, median = robust_summary(totals)
+            agg = self._aggregates.get(project_name)
+            mean = agg.mean('Total') if agg else None
+            return {
+                "Project Name": project_name,
+                "Stage": project.get('stage'),
+                "Submitted": len(totals),
+                "Trimmed Mean": round(trimmed, 2) if trimmed is not None else None,
+                "Total": round(mean, 2) if mean is not None else None,
+                "Median": round(median, 2) if median is not None else None,
+            }
+
+    def live_board(self):
+        """实时看板的 (版本号, 按去极值均分降序的实时统计行)，所有会话共用一份。
+
+        按变更流只重算有新变化的项目，版本未变时直接返回上次的排名；调用方不应修改返回的行。
+        """
+        with self._lock:
+            if self._live is not None and self._live[0] == self.version:
+                return self.version, self._live[2]
+            rows, changed = {}, None
+            if self._live is not None:
+                base, rows, _ = self._live
+                _, changed = self.changes_since(base)
+            if changed is None:
+                rows, changed = {}, list(self._projects)
+            for name in changed:
+                row = self.live_row(name)
+                if row is None:
+                    rows.pop(name, None)
+                else:
+                    rows[name] = row
+            ranking = sorted(
+                rows.values(),
+                key=lambda r: r['Trimmed Mean'] if r['Trimmed Mean'] is not None else float('-inf'),
+                reverse=True,
+            )
+            self._live = (self.version, rows, ranking)
+            return self.version, ranking
+
+    def summary(self):
+        """项目排名汇总，同一版本内复用结果。
+
+        各评分项平均分与评分专家数来自滚动统计，去极值均分、中位数、标准差、
+        标准化均分与异常专家来自分数矩阵的向量化计算；按去极值均分降序排列。
+        """
+        with self._lock:
+            if self._summary is not None and self._summary[0] == self.version:
+                return self._summary[1]
+            stats = self.matrix.statistics()
+            rows = []
+            for name, agg in self._aggregates.items():
+                row = {"Project Name": name}
+                for col in ['Total'] + self.score_cols:
+                    mean = agg.mean(col)
+                    row[col] = round(mean, 2) if mean is not None else None
+                row["Experts"] = agg.count
+                project_stats = stats.get(name, {})
+                for col in ("Trimmed Mean", "Median", "Std", "Z Mean"):
+                    x = project_stats.get(col)
+                    row[col] = round(x, 2) if x is not None and x == x else None
+                row["Outlier Experts"] = "、".join(project_stats.get("Outlier Experts", []))
+                rows.append(row)
+            rows.sort(key=lambda r: r['Trimmed Mean'] if r['Trimmed Mean'] is not None else float('-inf'), reverse=True)
+            self._summary = (self.version, rows)
+            return rows
+
+    # --- 写入 ---
+    def add_project(self, project):
+        self.add_projects([project])
+
+    def add_projects(self, projects):
+        """一次写入添加多个项目（批量导入只产生一次持久化）。"""
+        with self._lock:
+            self._write({"op": "add_projects", "projects": list(projects)})
+
+    def delete_project(self, name):
+        """删除项目及其全部评分，返回被删除的评分条数。"""
+        with self._lock:
+            return len(self._write({"op": "delete_project", "project": name}))
+
+    def clear_project_votes(self, name):
+        """清空某项目的全部最终评分，返回被删除的评分条数。"""
+        with self._lock:
+            self.sync()
+            if not self._by_project.get(name):
+                return 0
+            return len(self._write({"op": "clear_project", "project": name}))
+
+    def replace_expert_votes(self, expert, votes):
+        """用 votes 替换该专家的全部最终评分。"""
+        with self._lock:
+            self._write({"op": "replace_expert", "expert": expert, "rows": [dict(v) for v in votes]})
+
+    def submit_expert_votes(self, expert, votes, base_version, carried=()):
+        """乐观并发的最终提交：base_version 为专家看到总览时的数据版本，carried 为沿用已提交评分（未重新暂存）的项目。
+
+        其他专家的评分与本专家互不重叠，期间的其他写入一律自动合并；只有真正的冲突才抛出 SubmitConflict
+        且不写入任何数据。冲突检查与写入在同一次加锁内完成，锁只覆盖这一次写入本身。
+        votes 可以是会话中的紧凑记录（VoteRow），写入前转为普通字典。
+        """
+        votes = [dict(v) for v in votes]
+        with self._lock:
+            self._check_open()  # 在取跨进程锁之前检查，关闭后不再重新打开变更日志
+            with self._shared_lock():
+                if self._changelog is not None:
+                    self._catch_up(held=True)
+                deleted = [v['Project Name'] for v in votes if v['Project Name'] not in self._projects]
+                cleared = []
+                if self.version != base_version:
+                    _, changed = self.changes_since(base_version)
+                    cleared = [
+                        name for name in carried
+                        if (changed is None or name in changed)
+                        and name in self._projects and self.get_vote(name, expert) is None
+                    ]
+                if deleted or cleared:
+                    monitor.count("submit_conflicts")
+                    raise SubmitConflict(deleted, cleared)
+                self._write({"op": "replace_expert", "expert": expert, "rows": votes})
+
+    def _write(self, event):
+        """追上其他进程 -> 持久化 -> 更新内存索引 -> 广播变更 -> 记录历史 -> 后端维护（如日志压缩），返回被移除的评分。
+
+        调用方需持有锁；整个过程在跨进程写锁内完成。
+        """
+        self._check_open()
+        with monitor.phase("persistence"), self._shared_lock():
+            if self._changelog is not None:
+                self._catch_up(held=True)
+            self._storage.apply(event)
+            removed, added = self._apply(event)
+            if self._changelog is not None:
+                self._changelog.append(event)
+            if self.history is not None:
+                self.history.record(event, removed, added, self._state)
+            self._storage.checkpoint(self.votes)
+            return removed
+
+    def _check_open(self):
+        if self.closed:
+            raise PermissionError("该评审轮次的存储已关闭，不能再写入。")
+
+    def _apply(self, event):
+        op = event['op']
+        if op == "add_projects":
+            for project in event['projects']:
+                self._projects[project['name']] = project
+                for v in self._by_project.get(project['name'], {}).values():
+                    self._mark_completed(v)
+        elif op == "delete_project":
+            self._projects.pop(event['project'], None)
+        removed, added = apply_vote_event(self._by_project, event)
+        for v in removed:
+            self._completed.get(v['Expert'], set()).discard(v['Project Name'])
+        for v in added:
+            self._mark_completed(v)
+        matrix = self._matrix  # 尚未构建时无需修补，首次使用时按当时的评分构建
+        if op in ("clear_project", "delete_project"):
+            self._aggregates.pop(event['project'], None)
+            if matrix is not None:
+                matrix.clear_project(event['project'])
+        else:
+            for v in removed:
+                name = v['Project Name']
+                if matrix is not None:
+                    matrix.remove_vote(name, v['Expert'])
+                remaining = self._by_project.get(name)
+                if remaining:
+                    self._aggregates[name].remove(v, remaining.values())
+                else:
+                    self._aggregates.pop(name, None)
+            for v in added:
+                self._aggregate_for(v['Project Name']).add(v)
+                if matrix is not None:
+                    matrix.set_vote(v)
+        self.version += 1
+        if op == "add_projects":
+            changed = {p['name'] for p in event['projects']}
+        elif op == "replace_expert":
+            changed = {v['Project Name'] for v in removed} | {v['Project Name'] for v in added}
+        else:
+            changed = {event['project']}
+        self._feed.append((self.version, changed, added, time.time()))
+        return removed, added
+
+    def _mark_completed(self, vote):
+        if vote['Project Name'] in self._projects:
+            self._completed.setdefault(vote['Expert'], set()).add(vote['Project Name'])
+
+    def _aggregate_for(self, project_name):
+        agg = self._aggregates.get(project_name)
+        if agg is None:
+            agg = self._aggregates[project_name] = ProjectAggregate(self.score_cols)
+        return agg
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from changelog import ChangeLog  # noqa: E402
+from storage import CsvStorage, VoteJournal  # noqa: E402
+from store import VoteStore  # noqa: E402
+
+PROJECT_COLS = ['name', 'applicant', 'stage', 'time']
+SCORE_COLS = ['Research', 'Tech', 'Deliverables', 'Output', 'Budget']
+VOTE_COLS = ['Project Name', 'Stage', 'Expert'] + SCORE_COLS + ['Total', 'Time']
+
+
+def project(name, stage="中期"):
+    return {"name": name, "applicant": "申请人", "stage": stage, "time": 30}
+
+
+def vote(project_name, expert, research, stage="中期"):
+    scores = {"Research": research, "Tech": 20, "Deliverables": 15, "Output": 15, "Budget": 8}
+    return {"Project Name": project_name, "Stage": stage, "Expert": expert, **scores,
+            "Total": sum(scores.values()), "Time": "2024-01-01 09:00"}
+
+
+def fingerprint(store):
+    """比较两个存储内容是否一致用的摘要：项目、评分与排名。"""
+    return (
+        [p['name'] for p in store.projects()],
+        sorted((v['Project Name'], v['Expert'], v['Research'], v['Total']) for v in store.votes()),
+        [(r['Project Name'], r['Total'], r['Experts']) for r in store.summary()],
+    )
+
+
+@pytest.fixture
+def partition(tmp_path):
+    """一个轮次分区目录，返回 open_store(...)：每次调用都像新进程一样打开同一份数据。"""
+
+    def csv_storage(compact_every=500, read_only=False):
+        journal = VoteJournal(str(tmp_path / "final_votes.csv"), str(tmp_path / "final_votes.journal"),
+                              VOTE_COLS, compact_every)
+        return CsvStorage(str(tmp_path / "projects.csv"), PROJECT_COLS, journal, read_only=read_only)
+
+    def open_store(rotate_bytes=4 * 1024 * 1024, compact_every=500, history=None, shared_log=True):
+        changelog = ChangeLog(str(tmp_path / "changes.log"), rotate_bytes) if shared_log else None
+        return VoteStore(csv_storage(compact_every), SCORE_COLS, changelog, history)
+
+    open_store.csv_storage = csv_storage
+    open_store.path = tmp_path
+    return open_store
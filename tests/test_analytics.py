@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from analytics import ScoreMatrix, agreement, icc, kendall_w, pairwise_spearman, spearman
+
+# Shrout & Fleiss (1979) 的示例：6 个对象 × 4 位评分者
+SHROUT_FLEISS = np.array([[9, 2, 5, 8], [6, 1, 3, 2], [8, 4, 6, 8], [7, 1, 2, 6], [10, 5, 6, 9], [6, 2, 4, 7]], float)
+
+
+def test_icc_matches_published_values():
+    single, average = icc(SHROUT_FLEISS)
+    assert single == pytest.approx(0.29, abs=0.005)
+    assert average == pytest.approx(0.62, abs=0.005)
+
+
+def test_kendall_w_bounds():
+    identical = np.repeat(np.arange(6.0)[:, None], 4, axis=1)
+    assert kendall_w(identical) == pytest.approx(1.0)
+    assert 0 < kendall_w(SHROUT_FLEISS) < 1
+
+
+def test_pairwise_spearman_matches_pairwise_computation():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 6, (40, 5)).astype(float)  # 含大量并列
+    rho = pairwise_spearman(values, np.ones(values.shape, bool))
+    for a in range(5):
+        for b in range(5):
+            if a != b:
+                assert rho[a, b] == pytest.approx(spearman(values[:, a], values[:, b]))
+
+
+def test_pairwise_spearman_ranks_each_pair_on_common_projects():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 8, (30, 6)).astype(float)
+    rated = rng.random(values.shape) > 0.3  # 各专家评过的项目只部分重叠
+    rated[:, 0] = True                     # 也包含一位评过全部项目的专家
+    rated[3:, 5] = False                   # 与他人共同项目不足 3 个
+    values[~rated] = np.nan
+    rho = pairwise_spearman(values, rated)
+    for a in range(6):
+        for b in range(6):
+            if a == b:
+                continue
+            common = rated[:, a] & rated[:, b]
+            expected = spearman(values[common, a], values[common, b])
+            if expected is None:
+                assert np.isnan(rho[a, b])
+            else:
+                assert rho[a, b] == pytest.approx(expected)
+
+
+def test_agreement_uses_largest_complete_block():
+    data = np.full((6, 5, 2), np.nan)
+    data[:, :4, 0] = data[:, :4, -1] = SHROUT_FLEISS
+    data[:3, 4, 0] = data[:3, 4, -1] = [1, 2, 3]  # 第 5 位专家只评了 3 个项目
+    result = agreement(data, ["a", "b", "c", "d", "e"], ["X"])
+
+    assert result["experts"] == ["a", "b", "c", "d"] and result["projects"] == 6
+    assert result["icc_single"] == pytest.approx(icc(SHROUT_FLEISS)[0])
+    assert result["pairs"] == 10
+    assert len(result["weakest_pairs"]) == 10
+    assert [row["expert"] for row in result["bias"]] == ["a", "b", "c", "d", "e"]
+
+
+# --- ScoreMatrix：排名用的稳健统计 ---
+def matrix_from(totals):
+    """{项目: {专家: 总分}} -> ScoreMatrix（只用总分通道）。"""
+    matrix = ScoreMatrix(["X"], projects=2, experts=2)  # 初始容量很小，顺带覆盖扩容
+    for name, by_expert in totals.items():
+        for expert, total in by_expert.items():
+            matrix.set_vote({"Project Name": name, "Expert": expert, "X": total, "Total": total})
+    return matrix
+
+
+def test_statistics_trimmed_mean_median_and_std():
+    stats = matrix_from({
+        "P1": {"a": 60, "b": 70, "c": 80, "d": 100},
+        "P2": {"a": 50, "b": 90},
+    }).statistics()
+
+    assert stats["P1"]["Trimmed Mean"] == pytest.approx(75)  # 去掉 60 与 100
+    assert stats["P1"]["Median"] == pytest.approx(75)
+    assert stats["P1"]["Std"] == pytest.approx(np.std([60, 70, 80, 100], ddof=1))
+    assert stats["P2"]["Trimmed Mean"] == pytest.approx(70)  # 不足 3 人时为普通均值
+    assert stats["P2"]["Median"] == pytest.approx(70)
+
+
+def test_statistics_z_mean_removes_expert_leniency():
+    # b 对每个项目都比 a 高 20 分，标准化后两人意见相同
+    stats = matrix_from({
+        "P1": {"a": 60, "b": 80},
+        "P2": {"a": 70, "b": 90},
+        "P3": {"a": 80, "b": 100},
+    }).statistics()
+
+    assert [stats[p]["Z Mean"] for p in ("P1", "P2", "P3")] == pytest.approx([-1, 0, 1])
+
+
+def test_statistics_flags_outlier_experts():
+    stats = matrix_from({
+        "P1": {"a": 80, "b": 82, "c": 81, "d": 79, "e": 30},
+        "P2": {"a": 80, "b": 81},  # 少于 3 人时不判定异常
+    }).statistics()
+
+    assert stats["P1"]["Outlier Experts"] == ["e"]
+    assert stats["P2"]["Outlier Experts"] == []
+
+
+def test_matrix_updates_match_rebuild():
+    matrix = matrix_from({"P1": {"a": 60, "b": 70, "c": 90}, "P2": {"a": 50, "b": 55, "c": 65}})
+    matrix.remove_vote("P1", "c")
+    matrix.clear_project("P2")
+    matrix.set_vote({"Project Name": "P3", "Expert": "d", "X": 40, "Total": 40})
+
+    stats = matrix.statistics()
+    expected = matrix_from({"P1": {"a": 60, "b": 70}, "P3": {"d": 40}}).statistics()
+    assert sorted(stats) == ["P1", "P3"]
+    for name in stats:
+        assert stats[name]["Trimmed Mean"] == expected[name]["Trimmed Mean"]
+        assert stats[name]["Median"] == expected[name]["Median"]
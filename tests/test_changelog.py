@@ -0,0 +1,70 @@
+import json
+
+from conftest import fingerprint, project, vote
+from perf import monitor
+
+
+def full_reloads():
+    return monitor.counters().get("store_full_reloads", 0)
+
+
+def test_other_store_applies_writes_incrementally(partition):
+    a, b = partition(), partition()
+    a.add_projects([project("P1"), project("P2")])
+    a.replace_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)])
+    reloads = full_reloads()
+
+    assert b.sync() == 2
+    assert fingerprint(b) == fingerprint(a)
+    assert b.is_complete("张三")
+    assert full_reloads() == reloads
+    assert b.sync() == 0  # 没有新变更时什么也不做
+
+
+def test_interleaved_writers_converge(partition):
+    a, b = partition(), partition()
+    a.add_projects([project("P1"), project("P2")])
+    b.replace_expert_votes("李四", [vote("P1", "李四", 10), vote("P2", "李四", 11)])
+    a.replace_expert_votes("张三", [vote("P1", "张三", 18)])
+    b.clear_project_votes("P2")
+    a.delete_project("P1")
+    b.add_project(project("P3"))
+    a.sync()
+    b.sync()
+
+    assert fingerprint(a) == fingerprint(b) == fingerprint(partition(shared_log=False))
+    assert [p['name'] for p in a.projects()] == ["P2", "P3"]
+    assert a.votes() == []
+
+
+def test_reader_follows_rotation_without_full_reload(partition):
+    a, b = partition(rotate_bytes=400), partition(rotate_bytes=400)
+    a.add_projects([project(f"P{i}") for i in range(3)])
+    reloads = full_reloads()
+    for r in range(12):
+        a.replace_expert_votes("张三", [vote(f"P{i}", "张三", r) for i in range(3)])
+        b.sync()  # 每次轮换前都已读到旧文件末尾，切换到新文件即可
+        assert fingerprint(b) == fingerprint(a)
+
+    assert full_reloads() == reloads
+    with open(partition.path / "changes.log", encoding="utf-8") as f:
+        assert json.loads(f.readline())['base'] > 0  # 确实发生过轮换
+
+
+def test_reader_that_missed_a_rotated_segment_reloads(partition):
+    a, b = partition(rotate_bytes=400), partition(rotate_bytes=400)
+    a.add_projects([project(f"P{i}") for i in range(3)])
+    b.sync()
+    for r in range(12):  # b 一直不读，期间日志轮换了多次
+        a.replace_expert_votes("张三", [vote(f"P{i}", "张三", r) for i in range(3)])
+    reloads = full_reloads()
+
+    b.sync()
+    assert full_reloads() == reloads + 1
+    assert fingerprint(b) == fingerprint(a)
+    assert b._changelog.seq == a._changelog.seq
+
+    # 重新加载之后继续增量同步
+    a.clear_project_votes("P0")
+    assert b.sync() == 1
+    assert fingerprint(b) == fingerprint(a)
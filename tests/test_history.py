@@ -0,0 +1,79 @@
+import itertools
+import os
+
+import pytest
+
+import history
+from conftest import SCORE_COLS, fingerprint, project, vote
+from history import RevisionHistory, SnapshotStorage
+from store import VoteStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """每次取时间前进 1 秒，让每次写入都有确定、互不相同的时间戳。"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(history.time, "time", lambda: float(next(ticks)))
+
+
+def rebuild(hist, ts):
+    state = hist.state_at(ts)
+    if state is None:
+        return None
+    projects, votes = state
+    return fingerprint(VoteStore(SnapshotStorage(projects.values(), votes.values()), SCORE_COLS))
+
+
+def test_state_at_matches_every_past_state(partition, clock):
+    hist = RevisionHistory(str(partition.path / "history"), snapshot_every=3)
+    store = partition(history=hist)
+    seen = [(hist.span()[1], fingerprint(store))]  # 基准快照
+    writes = [
+        lambda: store.add_projects([project("P1"), project("P2")]),
+        lambda: store.replace_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)]),
+        lambda: store.replace_expert_votes("李四", [vote("P1", "李四", 10)]),
+        lambda: store.replace_expert_votes("张三", [vote("P1", "张三", 5), vote("P2", "张三", 12)]),
+        lambda: store.clear_project_votes("P2"),
+        lambda: store.delete_project("P1"),
+        lambda: store.add_project(project("P3")),
+        lambda: store.replace_expert_votes("王五", [vote("P3", "王五", 20)]),
+    ]
+    for write in writes:
+        write()
+        seen.append((hist.span()[1], fingerprint(store)))
+
+    # 每 3 条增量一个快照：回溯会从不同的快照开始重放
+    assert len([f for f in os.listdir(hist.directory) if f.startswith("snapshot-")]) == 1 + len(writes) // 3
+    for ts, expected in seen:
+        assert rebuild(hist, ts) == expected
+        assert rebuild(hist, ts + 0.5) == expected  # 两次写入之间的任一时刻
+    assert rebuild(hist, seen[0][0] - 1) is None  # 早于历史起点
+
+
+def test_other_process_deltas_are_indexed(partition, clock):
+    writer_hist = RevisionHistory(str(partition.path / "history"), snapshot_every=100)
+    reader_hist = RevisionHistory(str(partition.path / "history"), snapshot_every=100)
+    writer = partition(history=writer_hist)
+    writer.add_projects([project("P1")])
+    assert rebuild(reader_hist, writer_hist.span()[1]) == fingerprint(writer)
+    writer.replace_expert_votes("张三", [vote("P1", "张三", 18)])
+    assert rebuild(reader_hist, writer_hist.span()[1]) == fingerprint(writer)
+
+
+def test_changes_between_lists_who_changed_what(partition, clock):
+    hist = RevisionHistory(str(partition.path / "history"), snapshot_every=2)
+    store = partition(history=hist)
+    store.add_projects([project("P1")])
+    store.replace_expert_votes("张三", [vote("P1", "张三", 18)])
+    t1 = hist.span()[1]
+    store.replace_expert_votes("张三", [vote("P1", "张三", 10)])
+    store.clear_project_votes("P1")
+    t2 = hist.span()[1]
+
+    changes = [(actor, project_name, expert, kind, old, new) for _, actor, project_name, expert, kind, old, new
+               in hist.changes_between(t1, t2)]
+    assert changes == [
+        ("张三", "P1", "张三", "修改评分", 76, 68),
+        ("管理员", "P1", "张三", "删除评分", 68, None),
+    ]
+    assert [c[4] for c in hist.changes_between(0, t1)] == ["新增项目", "新增评分"]
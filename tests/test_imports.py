@@ -0,0 +1,55 @@
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import PROJECT_COLS
+from imports import read_project_file, validate_project_import
+
+STAGES = ("中期", "结题")
+
+
+def read(text, name="projects.csv"):
+    upload = io.BytesIO(text.encode("utf-8-sig"))
+    upload.name = name
+    return read_project_file(upload)
+
+
+def test_valid_rows_are_imported():
+    df = read("name,applicant,stage,time\n 项目A ,张三,中期,30\n项目B,,结题,12.5\n")
+    projects, errors = validate_project_import(df, [], STAGES, PROJECT_COLS)
+    assert errors.empty
+    assert projects == [
+        {"name": "项目A", "applicant": "张三", "stage": "中期", "time": 30},
+        {"name": "项目B", "applicant": "", "stage": "结题", "time": 12.5},
+    ]
+    assert isinstance(projects[0]["time"], int)
+
+
+def test_errors_are_reported_per_file_row():
+    df = read(
+        "name,applicant,stage,time\n"
+        "项目A,张三,中期,30\n"     # 第 2 行：与已有项目重名
+        ",李四,中期,30\n"          # 第 3 行：名称为空
+        "项目C,王五,立项,abc\n"    # 第 4 行：阶段与时长都不对
+        "项目D,赵六,结题,-5\n"     # 第 5 行：负数
+        "项目E,钱七,结题,inf\n"    # 第 6 行：无穷大
+        "项目F,孙八,中期,20\n"     # 第 7、8 行：文件内重名
+        "项目F,孙八,中期,20\n"
+        "项目G,周九,结题,0\n"
+    )
+    projects, errors = validate_project_import(df, ["项目A"], STAGES, PROJECT_COLS)
+
+    assert [p["name"] for p in projects] == ["项目G"]
+    by_row = dict(zip(errors["行号"], errors["错误"]))
+    assert by_row[2] == "项目名称已存在"
+    assert by_row[3] == "项目名称为空"
+    assert by_row[4] == "评审阶段必须是 中期/结题 之一；时长必须是数字"
+    assert by_row[5] == by_row[6] == "时长必须是非负的有限数字"
+    assert by_row[7] == by_row[8] == "文件内项目名称重复"
+
+
+def test_missing_columns_raise():
+    df = pd.DataFrame({"name": ["项目A"], "stage": ["中期"]}, dtype=str)
+    with pytest.raises(ValueError, match="applicant, time"):
+        validate_project_import(df, [], STAGES, PROJECT_COLS)
@@ -0,0 +1,55 @@
+import json
+
+from conftest import VOTE_COLS, fingerprint, project, vote
+from storage import load_data
+
+
+def test_restart_replays_journal_and_compacts(partition):
+    store = partition(shared_log=False)
+    store.add_projects([project("P1"), project("P2")])
+    store.replace_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)])
+    store.replace_expert_votes("李四", [vote("P1", "李四", 10)])
+    store.replace_expert_votes("张三", [vote("P1", "张三", 5)])
+    store.clear_project_votes("P2")
+    expected = fingerprint(store)
+    assert load_data(str(partition.path / "final_votes.csv"), VOTE_COLS) == []  # 尚未压缩，快照仍为空
+
+    restarted = partition(shared_log=False)
+    assert fingerprint(restarted) == expected
+    # 重放之后压缩：日志清空，快照即当前评分
+    assert (partition.path / "final_votes.journal").read_text(encoding="utf-8") == ""
+    snapshot = load_data(str(partition.path / "final_votes.csv"), VOTE_COLS)
+    assert sorted((v['Project Name'], v['Expert'], v['Research']) for v in snapshot) == [("P1", "张三", 5), ("P1", "李四", 10)]
+
+
+def test_torn_last_line_is_ignored(partition):
+    store = partition(shared_log=False)
+    store.add_projects([project("P1")])
+    store.replace_expert_votes("张三", [vote("P1", "张三", 18)])
+    expected = fingerprint(store)
+    with open(partition.path / "final_votes.journal", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "clear_project", "project": "P1"})[:20])  # 崩溃时写了一半
+
+    assert fingerprint(partition(shared_log=False)) == expected
+
+
+def test_compacts_every_n_events(partition):
+    store = partition(shared_log=False, compact_every=3)
+    store.add_projects([project("P1")])
+    for r in range(3):
+        store.replace_expert_votes("张三", [vote("P1", "张三", r)])
+
+    assert (partition.path / "final_votes.journal").read_text(encoding="utf-8") == ""
+    snapshot = load_data(str(partition.path / "final_votes.csv"), VOTE_COLS)
+    assert [(v['Expert'], v['Research']) for v in snapshot] == [("张三", 2)]
+
+
+def test_read_only_storage_does_not_compact(partition):
+    store = partition(shared_log=False)
+    store.add_projects([project("P1")])
+    store.replace_expert_votes("张三", [vote("P1", "张三", 18)])
+    journal = (partition.path / "final_votes.journal").read_text(encoding="utf-8")
+
+    storage = partition.csv_storage(read_only=True)
+    assert [v['Research'] for v in storage.load_votes()] == [18]
+    assert (partition.path / "final_votes.journal").read_text(encoding="utf-8") == journal
@@ -0,0 +1,38 @@
+import json
+import os
+import time
+
+from perf import PerfMonitor, process_path
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "后台导出线程没有按时写出"
+        time.sleep(0.01)
+
+
+def test_each_process_exports_its_own_labelled_files(tmp_path):
+    monitor = PerfMonitor()
+    with monitor.phase("render"):
+        pass
+    monitor.count("rows_read", 3)
+    monitor.start_export(str(tmp_path / "metrics.prom"), str(tmp_path / "metrics.json"), interval=0.01)
+
+    prom_path, json_path = monitor.export_paths
+    assert prom_path == str(tmp_path / f"metrics-{os.getpid()}.prom") == process_path(str(tmp_path / "metrics.prom"))
+    wait_for(lambda: os.path.exists(json_path))
+    text = open(prom_path, encoding="utf-8").read()
+    assert f'ess_rows_read_total{{process="{os.getpid()}"}} 3' in text
+    assert f'ess_phase_milliseconds_count{{process="{os.getpid()}",phase="render"}} 1' in text
+    assert json.load(open(json_path, encoding="utf-8"))["pid"] == os.getpid()
+    assert not os.path.exists(tmp_path / "metrics.prom")
+
+
+def test_failed_export_is_counted_and_reported(tmp_path):
+    monitor = PerfMonitor()
+    missing = tmp_path / "no-such-dir"
+    monitor.start_export(str(missing / "metrics.prom"), str(missing / "metrics.json"), interval=0.01)
+
+    wait_for(lambda: monitor.counters().get("metrics_export_errors", 0) > 0)
+    assert "FileNotFoundError" in monitor.export_error
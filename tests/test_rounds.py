@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from conftest import project, vote
+
+
+def test_closed_store_rejects_writes(partition):
+    store = partition()
+    store.add_projects([project("P1")])
+    journal = partition.path / "final_votes.journal"
+    size = os.path.getsize(journal) if journal.exists() else 0
+    store.close()
+
+    # 轮次结束后仍持有旧实例的回调不能再写进已归档的轮次
+    with pytest.raises(PermissionError):
+        store.submit_expert_votes("张三", [vote("P1", "张三", 18)], store.version)
+    with pytest.raises(PermissionError):
+        store.add_project(project("P2"))
+    assert store.sync() == 0
+    assert (os.path.getsize(journal) if journal.exists() else 0) == size
+    assert partition().votes() == []
+    assert [p['name'] for p in store.projects()] == ["P1"]  # 关闭后仍可读取
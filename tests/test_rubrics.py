@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from rubrics import compile_rubrics, load_rubrics
+
+CONFIG = {
+    "stages": {
+        "中期": [
+            {"key": "Research", "name": "研究目标", "max": 20,
+             "bands": [["符合要求", 16, 20], ["基本符合", 12, 15], ["不符合", 0, 11]]},
+            {"key": "Budget", "name": "经费", "max": 10, "weight": 1.5},
+        ],
+        "立项": [
+            {"key": "Innovation", "name": "创新性", "max": 50, "weight": 0.5},
+            {"key": "Research", "name": "研究目标", "max": 20},
+        ],
+    },
+}
+
+
+@pytest.fixture
+def rubrics():
+    return compile_rubrics(CONFIG)
+
+
+def test_stages_and_score_columns(rubrics):
+    assert rubrics.stages == ("中期", "立项")
+    assert rubrics.score_cols == ("Research", "Budget", "Innovation")  # 各阶段并集，按首次出现顺序
+    assert "立项" in rubrics and "结题" not in rubrics
+
+
+def test_validate_accepts_scores_in_range(rubrics):
+    scores, errors = rubrics["中期"].validate({"Research": "20", "Budget": " 0 "})
+    assert scores == {"Research": 20, "Budget": 0} and errors == {}
+
+
+def test_validate_reports_each_bad_input(rubrics):
+    scores, errors = rubrics["中期"].validate({"Research": "21", "Budget": "8.5"})
+    assert scores == {"Research": 0, "Budget": 0}  # 无效输入按 0 分计
+    assert "0 到 20 之间" in errors["Research"]
+    assert "必须是整数" in errors["Budget"]
+
+    scores, errors = rubrics["中期"].validate({"Research": "-1"})
+    assert scores == {"Research": 0, "Budget": 0}
+    assert list(errors) == ["Research"]  # 空输入不算错误
+
+
+def test_weighted_total(rubrics):
+    mid = rubrics["中期"]
+    total = mid.total({"Research": 10, "Budget": 4})
+    assert total == 16 and isinstance(total, int)  # 结果为整数时返回 int
+    assert mid.total({"Research": 10, "Budget": 3}) == 14.5
+    assert mid.total({"Research": 10}) == 10  # 缺少的评分项按 0 分计
+    assert mid.max_total == 35
+    assert rubrics["立项"].max_total == 45
+
+
+def test_tips_from_bands(rubrics):
+    research, budget = rubrics["中期"].criteria
+    assert research.tips == "符合要求16\\~20分；基本符合12\\~15分；不符合＜12分。"
+    assert research.title == "研究目标 (20分)"
+    assert budget.tips == ""
+
+
+@pytest.mark.parametrize("config, message", [
+    ({}, "缺少 stages"),
+    ({"stages": {"中期": []}}, "没有评分项"),
+    ({"stages": {"中期": [{"key": "Total", "name": "总分", "max": 100}]}}, "保留列名"),
+    ({"stages": {"中期": [{"key": "Research", "name": "研究目标"}]}}, "评分项配置有误"),
+    ({"stages": {"中期": [{"key": "Research", "name": "研究目标", "max": "二十"}]}}, "评分项配置有误"),
+])
+def test_invalid_config_raises(config, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rubrics(config)
+
+
+def test_load_rubrics_recompiles_only_when_file_changes(tmp_path):
+    path = tmp_path / "rubrics.json"
+    path.write_text(json.dumps(CONFIG, ensure_ascii=False), encoding="utf-8")
+    first = load_rubrics(str(path))
+    assert load_rubrics(str(path)) is first
+
+    changed = {"stages": {"结题": CONFIG["stages"]["中期"]}}
+    path.write_text(json.dumps(changed, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (1, 1))  # 保证修改时间与上次不同
+    assert load_rubrics(str(path)).stages == ("结题",)
+
+
+def test_shipped_config_compiles():
+    rubrics = load_rubrics(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rubrics.json"))
+    for stage in rubrics.stages:
+        assert rubrics[stage].max_total == 100
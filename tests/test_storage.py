@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import PROJECT_COLS, VOTE_COLS, project, vote
+from storage import SqliteStorage
+
+
+def open_db_files(path):
+    """本进程打开的、属于该数据库（含 -wal / -shm）的文件描述符数。"""
+    fds = "/proc/self/fd"
+    count = 0
+    for fd in os.listdir(fds):
+        try:
+            target = os.readlink(os.path.join(fds, fd))
+        except OSError:
+            continue
+        if target.startswith(str(path)):
+            count += 1
+    return count
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="需要 /proc/self/fd 统计文件描述符")
+def test_writes_from_many_threads_share_one_connection(tmp_path):
+    path = tmp_path / "review.db"
+    storage = SqliteStorage(str(path), PROJECT_COLS, VOTE_COLS)
+
+    # Streamlit 每次重跑都在新线程中执行，写入来自许多短命线程
+    def write(i):
+        storage.apply({"op": "add_projects", "projects": [project(f"P{i}")]})
+        storage.apply({"op": "replace_expert", "expert": f"专家{i}", "rows": [vote(f"P{i}", f"专家{i}", 10)]})
+
+    for batch in range(5):
+        threads = [threading.Thread(target=write, args=(batch * 40 + i,)) for i in range(40)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(storage.load_projects()) == 200
+    assert len(storage.load_votes()) == 200
+    assert open_db_files(path) <= 3  # 一个连接：数据库、-wal、-shm
+    storage.close()
+    assert open_db_files(path) == 0
+
+
+def test_read_only_storage_does_not_modify_database(tmp_path):
+    path = tmp_path / "review.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE projects ("name", "applicant", "stage", "time")')
+        conn.execute('CREATE TABLE votes ("Project Name", "Stage", "Expert", "Total")')
+        conn.execute("INSERT INTO projects VALUES ('P1', '申请人', '中期', 30)")
+    conn.close()
+
+    storage = SqliteStorage(str(path), PROJECT_COLS, VOTE_COLS, read_only=True)
+    assert storage.load_projects() == [project("P1")]
+    assert storage.load_votes() == []
+    with pytest.raises(sqlite3.OperationalError):
+        storage.apply({"op": "add_projects", "projects": [project("P2")]})
+    storage.close()
+    with sqlite3.connect(path) as conn:
+        assert "Research" not in {row[1] for row in conn.execute("PRAGMA table_info(votes)")}
+    conn.close()
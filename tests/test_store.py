@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import fingerprint, project, vote
+from store import SubmitConflict
+
+
+@pytest.fixture
+def two_sessions(partition):
+    """同一个分区上的两个进程：管理员在 admin 中操作，专家在 expert 中提交。"""
+    admin, expert = partition(), partition()
+    admin.add_projects([project("P1"), project("P2")])
+    expert.sync()
+    return admin, expert
+
+
+def test_unrelated_writes_are_merged(two_sessions):
+    admin, expert = two_sessions
+    base = expert.version
+    admin.replace_expert_votes("李四", [vote("P1", "李四", 10)])
+    admin.add_project(project("P3"))
+
+    expert.submit_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)], base)
+    admin.sync()
+    assert fingerprint(admin) == fingerprint(expert)
+    assert sorted(expert.votes_for_expert("张三")) == ["P1", "P2"]
+    assert expert.get_vote("P1", "李四") is not None
+
+
+def test_deleted_project_conflicts_and_writes_nothing(two_sessions):
+    admin, expert = two_sessions
+    base = expert.version
+    admin.delete_project("P2")
+
+    with pytest.raises(SubmitConflict) as info:
+        expert.submit_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)], base)
+    assert info.value.deleted == ["P2"] and info.value.cleared == []
+    assert expert.votes_for_expert("张三") == {}
+    admin.sync()
+    assert admin.votes() == []
+
+
+def test_cleared_carried_vote_conflicts(two_sessions):
+    admin, expert = two_sessions
+    expert.submit_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)], expert.version)
+    admin.sync()
+    base = expert.version
+    admin.clear_project_votes("P1")  # 管理员清空了专家沿用的已提交评分
+
+    with pytest.raises(SubmitConflict) as info:
+        expert.submit_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 15)], base, carried=["P1"])
+    assert info.value.cleared == ["P1"]
+    assert expert.get_vote("P1", "张三") is None
+    assert expert.get_vote("P2", "张三")['Research'] == 12  # 冲突时不写入任何数据
+
+
+def test_resubmitted_cleared_project_is_not_a_conflict(two_sessions):
+    admin, expert = two_sessions
+    expert.submit_expert_votes("张三", [vote("P1", "张三", 18), vote("P2", "张三", 12)], expert.version)
+    admin.sync()
+    base = expert.version
+    admin.clear_project_votes("P1")
+
+    # P1 被重新暂存过（不在 carried 中），提交的是专家新给的分数
+    expert.submit_expert_votes("张三", [vote("P1", "张三", 9), vote("P2", "张三", 12)], base, carried=["P2"])
+    assert expert.get_vote("P1", "张三")['Research'] == 9
+    assert expert.is_complete("张三")
+
+
+# --- 打分明细浏览：find_projects ---
+@pytest.fixture
+def browse(partition):
+    store = partition(shared_log=False)
+    store.add_projects([project("Alpha"), project("beta", "结题"), project("Gamma"), project("Delta", "结题")])
+    store.replace_expert_votes("张三", [vote("Alpha", "张三", 20), vote("beta", "张三", 5, "结题")])
+    store.replace_expert_votes("李四", [vote("Alpha", "李四", 10), vote("Gamma", "李四", 12)])
+    return store  # 总分：Alpha 78/68，beta 63，Gamma 70，Delta 无评分
+
+
+def test_find_projects_filters(browse):
+    assert browse.find_projects() == ["Alpha", "Delta", "Gamma", "beta"]
+    assert browse.find_projects(search=" A ") == ["Alpha", "Delta", "Gamma", "beta"]
+    assert browse.find_projects(search="ET") == ["beta"]
+    assert browse.find_projects(expert="张三") == ["Alpha", "beta"]
+    assert browse.find_projects(expert="王五") == []
+    assert browse.find_projects(stage="结题") == ["Delta", "beta"]
+    assert browse.find_projects(expert="李四", stage="中期", search="gam") == ["Gamma"]
+
+
+def test_find_projects_total_range_uses_min_and_max(browse):
+    assert browse.find_projects(total_range=(75, 100)) == ["Alpha"]  # 68~78 与区间有交集
+    assert browse.find_projects(total_range=(64, 69)) == ["Alpha"]
+    assert browse.find_projects(total_range=(60, 70)) == ["Alpha", "Gamma", "beta"]  # 没有评分的项目不在任何区间内
+
+
+def test_find_projects_sorting(browse):
+    assert browse.find_projects(sort_by="mean", descending=True) == ["Alpha", "Gamma", "beta", "Delta"]
+    assert browse.find_projects(sort_by="experts", descending=True)[0] == "Alpha"
+    assert browse.find_projects(sort_by="experts")[0] == "Delta"
+
+
+def test_find_projects_follows_writes(browse):
+    browse.clear_project_votes("Alpha")
+    browse.delete_project("Gamma")
+    assert browse.find_projects(expert="李四") == []
+    assert browse.find_projects(total_range=(60, 80)) == ["beta"]
+
+
+# --- 分数矩阵按需构建 ---
+def test_data_layer_does_not_import_numpy():
+    code = "import sys, storage, store, reliability; print('numpy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_lazily_built_matrix_matches_incremental_updates(partition):
+    early = partition(shared_log=False)
+    early.add_projects([project("P1"), project("P2"), project("P3")])
+    early.summary()  # 先构建矩阵，之后的写入增量修补
+    for expert, research in (("张三", 18), ("李四", 5), ("王五", 12), ("赵六", 20)):
+        early.replace_expert_votes(expert, [vote("P1", expert, research), vote("P2", expert, research // 2)])
+    early.clear_project_votes("P2")
+    early.replace_expert_votes("李四", [vote("P1", "李四", 19), vote("P3", "李四", 7)])
+
+    late = partition(shared_log=False)  # 重新加载，矩阵在第一次 summary() 时才按当前评分构建
+    assert late._matrix is None
+    assert late.summary() == early.summary()